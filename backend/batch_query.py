@@ -0,0 +1,81 @@
+"""Answer many questions in one go (nightly regression runs, precomputing answers).
+
+    python batch_query.py questions.jsonl answers.jsonl
+
+Each input line is either a JSON string or an object such as
+{"id": "q1", "question": "BCA semester 3 courses", "user_role": "guest"}.
+Each output line echoes the id and question and adds "response" and "error".
+"""
+import os
+import sys
+import json
+import time
+
+BATCH_MAX_ITEMS = 1000
+# /api/query/batch answers inside one request. The cap bounds that request's
+# latency and how much Groq and LLM-pool capacity one caller can take at once
+# (gthread workers keep heartbeating, so it is not about the worker timeout);
+# bigger jobs use this CLI
+BATCH_HTTP_MAX_ITEMS = int(os.getenv("BATCH_HTTP_MAX_ITEMS", "50"))
+
+
+def parse_jsonl_items(lines, max_items=BATCH_MAX_ITEMS):
+    """Parse JSONL question lines into batch items; raises ValueError on bad input"""
+    items = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_no}: invalid JSON ({e.msg})")
+        if isinstance(value, str):
+            value = {"question": value}
+        if not isinstance(value, dict) or not str(value.get("question", "")).strip():
+            raise ValueError(f"line {line_no}: expected a string or an object with 'question'")
+        value.setdefault("id", line_no)
+        items.append(value)
+    if len(items) > max_items:
+        hint = " (use batch_query.py for larger runs)" if max_items < BATCH_MAX_ITEMS else ""
+        raise ValueError(f"too many questions ({len(items)}), limit is {max_items}{hint}")
+    return items
+
+
+def run_batch(system, items):
+    """Answer items with system.generate_batch and attach ids/questions to the results"""
+    results = system.generate_batch(items)
+    return [
+        {"id": item.get("id"), "question": item["question"], **result}
+        for item, result in zip(items, results)
+    ]
+
+
+def to_jsonl(rows):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python batch_query.py questions.jsonl [answers.jsonl]")
+        sys.exit(2)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        items = parse_jsonl_items(f)
+
+    from query_llm import CollegeQuerySystem
+    system = CollegeQuerySystem()
+
+    start = time.perf_counter()
+    rows = run_batch(system, items)
+    elapsed = time.perf_counter() - start
+
+    output = to_jsonl(rows)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+    failed = sum(1 for row in rows if row["error"])
+    print(f"✅ Answered {len(rows) - failed}/{len(rows)} questions in {elapsed:.1f}s", file=sys.stderr)
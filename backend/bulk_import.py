@@ -0,0 +1,247 @@
+"""Bulk student/teacher import from CSV or JSONL (new intakes, staff rosters).
+
+The whole file is validated and de-duplicated locally before anything is
+written. Auth users are then created with bounded concurrency and the table
+rows inserted in batches. Every input row gets a result, and a row whose
+insert fails has its Auth user deleted again. With atomic=True any failure
+rolls back the whole import.
+"""
+import io
+import os
+import re
+import csv
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import date_convert
+
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "2000"))
+BULK_AUTH_CONCURRENCY = int(os.getenv("BULK_AUTH_CONCURRENCY", "8"))
+BULK_INSERT_BATCH = int(os.getenv("BULK_INSERT_BATCH", "100"))
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Same required/stored fields as the single-record add_student / add_teacher routes
+KINDS = {
+    "students": {
+        "table": "students_data",
+        "role": "student",
+        "required": ["email", "password", "full_name", "name", "roll_no", "program"],
+        "columns": [
+            "name", "dob_ad", "dob_bs", "gender", "phone", "email", "perm_address", "temp_address",
+            "program", "batch", "section", "year_semester", "roll_no", "symbol_no",
+            "registration_no", "joined_date"
+        ],
+    },
+    "teachers": {
+        "table": "teachers_data",
+        "role": "teacher",
+        "required": ["email", "password", "full_name", "name", "designation", "subject"],
+        "columns": ["name", "designation", "phone", "email", "address", "degree", "subject"],
+    },
+}
+
+
+def parse_records(text, fmt):
+    """[(row_no, record)] from CSV (header row) or JSONL text; raises ValueError on bad input"""
+    records = []
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            raise ValueError("CSV has no header row")
+        for row_no, row in enumerate(reader, start=2):
+            record = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            if any(record.values()):
+                records.append((row_no, record))
+    elif fmt == "jsonl":
+        for row_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {row_no}: invalid JSON ({e.msg})")
+            if not isinstance(record, dict):
+                raise ValueError(f"line {row_no}: expected an object")
+            records.append((row_no, {k: v.strip() if isinstance(v, str) else v for k, v in record.items()}))
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected csv or jsonl")
+
+    if not records:
+        raise ValueError("No records found")
+    if len(records) > BULK_IMPORT_MAX_ROWS:
+        raise ValueError(f"too many rows ({len(records)}), limit is {BULK_IMPORT_MAX_ROWS}")
+    return records
+
+
+def _student_id(record):
+    return f"{record['roll_no']}-{record['program']}".upper().replace(" ", "")
+
+
+def _fill_dob(record):
+    """Complete dob_bs from dob_ad (or the reverse) in-process; returns an error or None"""
+    try:
+        if record.get("dob_ad") and not record.get("dob_bs"):
+            record["dob_bs"] = date_convert.ad_to_bs(record["dob_ad"])
+        elif record.get("dob_bs") and not record.get("dob_ad"):
+            record["dob_ad"] = date_convert.bs_to_ad(record["dob_bs"])
+    except ValueError as e:
+        return f"Invalid date of birth: {e}"
+    return None
+
+
+def validate_records(kind, records, existing_emails=(), existing_student_ids=()):
+    """Split records into rows to import and per-row errors, without touching the database.
+
+    existing_emails / existing_student_ids: values already present in the table.
+    Returns (valid, results): valid is [(row_no, record)], results maps row_no -> result.
+    """
+    spec = KINDS[kind]
+    existing_emails = {e.lower() for e in existing_emails}
+    taken_ids = set(existing_student_ids)
+    seen_emails = {}
+    valid, results = [], {}
+
+    for row_no, record in records:
+        email = str(record.get("email") or "").lower()
+        record["email"] = email
+        missing = [f for f in spec["required"] if not record.get(f)]
+        if missing:
+            error = f"Missing required field(s): {', '.join(missing)}"
+        elif not EMAIL_RE.match(email):
+            error = "Invalid email address"
+        elif email in seen_emails:
+            error = f"Duplicate of row {seen_emails[email]}"
+        elif email in existing_emails:
+            error = "Email already exists"
+        elif kind == "students":
+            error = _fill_dob(record)
+        else:
+            error = None
+
+        if error:
+            results[row_no] = {"row": row_no, "email": email or None, "status": "invalid", "error": error}
+            continue
+        seen_emails[email] = row_no
+
+        if kind == "students":
+            student_id = _student_id(record)
+            if student_id in taken_ids:
+                # Same rule as add_student: suffix a clashing id instead of rejecting the row
+                student_id = f"{student_id}-{str(uuid.uuid4())[:8]}"
+            taken_ids.add(student_id)
+            record["student_id"] = student_id
+        valid.append((row_no, record))
+
+    return valid, results
+
+
+def run_import(kind, records, store, atomic=False, dry_run=False):
+    """Import parsed records through store and return {'summary', 'results'}.
+
+    store provides: existing_emails(emails), existing_student_ids(ids),
+    create_auth_user(email, password, role, full_name) -> user id,
+    delete_auth_user(user_id), insert_rows(table, rows) -> inserted rows,
+    delete_rows(table, ids).
+    """
+    spec = KINDS[kind]
+    emails = [str(r.get("email") or "").lower() for _, r in records]
+    existing = store.existing_emails([e for e in emails if e])
+    existing_ids = []
+    if kind == "students":
+        existing_ids = store.existing_student_ids([
+            _student_id(r) for _, r in records if r.get("roll_no") and r.get("program")
+        ])
+
+    valid, results = validate_records(kind, records, existing, existing_ids)
+
+    if dry_run or (atomic and results):
+        # An atomic import with invalid rows is refused before anything is written
+        status = "valid" if dry_run else "skipped"
+        for row_no, record in valid:
+            results[row_no] = {"row": row_no, "email": record["email"], "status": status}
+        return _report(records, results, dry_run=dry_run)
+
+    # 1. Auth users, a bounded number at a time
+    def _create(item):
+        row_no, record = item
+        try:
+            user_id = store.create_auth_user(
+                record["email"], record["password"], spec["role"], record["full_name"]
+            )
+            return row_no, user_id, None
+        except Exception as e:
+            return row_no, None, str(e)
+
+    by_row = dict(valid)
+    auth_ids = {}
+    with ThreadPoolExecutor(max_workers=BULK_AUTH_CONCURRENCY) as pool:
+        for row_no, user_id, error in pool.map(_create, valid):
+            if error:
+                results[row_no] = {"row": row_no, "email": by_row[row_no]["email"],
+                                   "status": "error", "error": f"Auth user creation failed: {error}"}
+            else:
+                auth_ids[row_no] = user_id
+
+    # 2. Table rows in batches; a failing batch is retried row by row to find the bad rows
+    pending = []
+    for row_no, record in valid:
+        if row_no not in auth_ids:
+            continue
+        row = {col: record.get(col) or None for col in spec["columns"]}
+        if kind == "students":
+            row["student_id"] = record["student_id"]
+        row["supabase_user_id"] = auth_ids[row_no]
+        pending.append((row_no, row))
+
+    if atomic and results:
+        pending = []  # an Auth failure already dooms an atomic import
+
+    inserted = {}
+    for start in range(0, len(pending), BULK_INSERT_BATCH):
+        batch = pending[start:start + BULK_INSERT_BATCH]
+        try:
+            rows = store.insert_rows(spec["table"], [row for _, row in batch])
+            if len(rows) != len(batch):
+                raise RuntimeError("insert returned fewer rows than sent")
+            for (row_no, _), saved in zip(batch, rows):
+                inserted[row_no] = saved
+        except Exception:
+            for row_no, row in batch:
+                try:
+                    inserted[row_no] = store.insert_rows(spec["table"], [row])[0]
+                except Exception as e:
+                    results[row_no] = {"row": row_no, "email": row["email"], "status": "error",
+                                       "error": f"Insert failed: {e}"}
+
+    # 3. Roll back Auth users whose row did not make it (or everything, when atomic)
+    failed = bool(results)
+    if atomic and failed and inserted:
+        store.delete_rows(spec["table"], [saved["id"] for saved in inserted.values()])
+    for row_no, user_id in auth_ids.items():
+        if row_no not in inserted or (atomic and failed):
+            try:
+                store.delete_auth_user(user_id)
+            except Exception as e:
+                print(f"⚠️ Rollback: failed to delete auth user {user_id}: {e}")
+
+    for row_no, saved in inserted.items():
+        if atomic and failed:
+            results[row_no] = {"row": row_no, "email": saved.get("email"), "status": "rolled_back"}
+        else:
+            results[row_no] = {"row": row_no, "email": saved.get("email"), "status": "created", "id": saved.get("id")}
+    for row_no in auth_ids:
+        if row_no not in results:
+            # Valid rows of a doomed atomic import whose Auth user was created and removed again
+            results[row_no] = {"row": row_no, "email": by_row[row_no]["email"], "status": "rolled_back"}
+
+    return _report(records, results)
+
+
+def _report(records, results, dry_run=False):
+    ordered = [results[row_no] for row_no, _ in records if row_no in results]
+    summary = {"total": len(records), "dry_run": dry_run}
+    for result in ordered:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": ordered}
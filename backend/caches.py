@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+
+from invalidation import bus
+
+# ---------------- Cache config ----------------
+STUDENT_COUNT_TTL = float(os.getenv("STUDENT_COUNT_TTL", "300"))
+STUDENT_LIST_CURSOR_TTL = float(os.getenv("STUDENT_LIST_CURSOR_TTL", "900"))
+# Short: other workers only see roster changes once their copy expires
+ADMIN_ROSTER_TTL = float(os.getenv("ADMIN_ROSTER_TTL", "10"))
+# Used instead while the change poller follows the tables' updated_at, i.e.
+# edits made anywhere reach this worker as events and the TTL is only a backstop
+STUDENT_COUNT_TRACKED_TTL = float(os.getenv("STUDENT_COUNT_TRACKED_TTL", "1800"))
+ADMIN_ROSTER_TRACKED_TTL = float(os.getenv("ADMIN_ROSTER_TRACKED_TTL", "300"))
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "1800"))
+CHAT_SESSION_OWNER_TTL = float(os.getenv("CHAT_SESSION_OWNER_TTL", "3600"))
+# How long a verified access token is trusted without asking Supabase Auth again
+AUTH_TOKEN_TTL = float(os.getenv("AUTH_TOKEN_TTL", "60"))
+
+
+class TTLCache:
+    """Small thread-safe dict cache whose entries expire after ttl seconds.
+
+    ttl may be a callable returning the seconds, read whenever an entry is set.
+
+    Each gunicorn worker has its own copy, so invalidate() only clears the
+    calling process; the other workers hear about changes from their own
+    change poller (see invalidation.py).
+    """
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop the entry closest to expiry
+                del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (time.monotonic() + self._ttl(), value)
+
+    def _ttl(self):
+        return self.ttl() if callable(self.ttl) else self.ttl
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only those whose key matches predicate"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if predicate(k)]:
+                    del self._entries[key]
+
+    def update(self, fn):
+        """Replace every live value with fn(value), keeping its expiry"""
+        with self._lock:
+            for key, (expires_at, value) in list(self._entries.items()):
+                self._entries[key] = (expires_at, fn(value))
+
+    def snapshot(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self._ttl()}
+
+
+def tracked_ttl(short, tracked, *tables):
+    """tracked seconds while the poller sees every edit to tables, short otherwise"""
+    return lambda: tracked if all(bus.is_tracked(t) for t in tables) else short
+
+
+# Student totals/breakdowns for the student_count intent; cleared on student changes
+student_counts = TTLCache(tracked_ttl(STUDENT_COUNT_TTL, STUDENT_COUNT_TRACKED_TTL, "students_data"))
+
+# Where each user's last student list stopped, for "show more" (per worker:
+# a continuation only works on the worker that served the list)
+student_list_cursors = TTLCache(STUDENT_LIST_CURSOR_TTL)
+
+# Serialized /admin/students and /admin/teachers pages with their ETags
+admin_rosters = TTLCache(
+    tracked_ttl(ADMIN_ROSTER_TTL, ADMIN_ROSTER_TRACKED_TTL, "students_data", "teachers_data")
+)
+
+# Each chat session's last resolved turn, for follow-up questions. Like the
+# cursors above it lives in one worker's memory: with several gunicorn workers a
+# follow-up that lands on another worker finds no state and is answered as asked.
+conversation_states = TTLCache(CONVERSATION_TTL)
+
+# Auth user id owning each chat session, checked before /api/query logs a turn
+chat_session_owners = TTLCache(CHAT_SESSION_OWNER_TTL)
+
+# sha256(access token) -> auth user id
+verified_tokens = TTLCache(AUTH_TOKEN_TTL)
+
+
+# ---------------- Invalidation wiring ----------------
+def _forget_people(person_type, ids):
+    """Drop remembered person records that may have changed from conversation states"""
+    def _drop(state):
+        person = state.get("person")
+        if not person or person["record"]["type"] != person_type:
+            return state
+        if ids and person["record"]["data"].get("id") not in ids:
+            return state
+        return {**state, "person": None}
+
+    conversation_states.update(_drop)
+
+
+def _on_students_changed(event):
+    student_counts.invalidate()
+    admin_rosters.invalidate(lambda key: key[0] == "students_data")
+    # Keyset cursors stay valid across writes; only the remembered total goes stale
+    student_list_cursors.update(lambda cursor: {**cursor, "total": None})
+    _forget_people("student", event["ids"])
+
+
+def _on_teachers_changed(event):
+    admin_rosters.invalidate(lambda key: key[0] == "teachers_data")
+    _forget_people("teacher", event["ids"])
+
+
+bus.subscribe("students_data", _on_students_changed)
+bus.subscribe("teachers_data", _on_teachers_changed)
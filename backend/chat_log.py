@@ -0,0 +1,131 @@
+"""Write-behind persistence of chat messages.
+
+/api/query hands each finished turn (user question + bot reply) to the
+writer and returns immediately. A background thread inserts the queued
+messages into chat_messages in one request per batch, flushing when
+CHAT_LOG_BATCH_SIZE messages are waiting and otherwise every
+CHAT_LOG_FLUSH_SECONDS. Besides session_id/message_text/sender, rows carry
+created_at (so a batch keeps question-before-answer order), query_type (the
+route that produced the answer) and latency_ms; if the table has no such
+columns the writer drops them and keeps going. A question that failed is
+logged without a reply.
+
+The caller must make sure the session belongs to the requester: rows are
+inserted with the service role, so RLS does not check them.
+
+Messages still queued when the process dies are lost, so flush() is called
+at exit and from gunicorn's worker_exit hook.
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone, timedelta
+
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "50"))
+CHAT_LOG_FLUSH_SECONDS = float(os.getenv("CHAT_LOG_FLUSH_SECONDS", "2"))
+CHAT_LOG_MAX_QUEUE = int(os.getenv("CHAT_LOG_MAX_QUEUE", "10000"))
+CHAT_LOG_RETRIES = int(os.getenv("CHAT_LOG_RETRIES", "3"))
+
+EXTRA_COLUMNS = ("query_type", "latency_ms")
+
+
+class ChatLogWriter:
+    def __init__(self, insert_rows, batch_size=CHAT_LOG_BATCH_SIZE, flush_seconds=CHAT_LOG_FLUSH_SECONDS,
+                 max_queue=CHAT_LOG_MAX_QUEUE):
+        self.insert_rows = insert_rows  # insert_rows(rows) -> raises on failure
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._extra_columns = True
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "failed_batches": 0}
+
+    def log_turn(self, session_id, question, response, latency_ms, query_type=None):
+        """Queue a question/answer pair (response None: the question alone)"""
+        self._ensure_thread()
+        answered_at = datetime.now(timezone.utc)
+        item = {
+            "session_id": session_id, "question": question, "response": response,
+            "asked_at": (answered_at - timedelta(milliseconds=latency_ms)).isoformat(),
+            "answered_at": answered_at.isoformat(),
+            "latency_ms": latency_ms, "query_type": query_type,
+        }
+        messages = 1 if response is None else 2
+        try:
+            self._queue.put_nowait(item)
+            self.stats["queued"] += messages
+            if self._queue.qsize() * 2 >= self.batch_size:
+                self._wake.set()
+        except queue.Full:
+            self.stats["dropped"] += messages
+            print("⚠️ Chat log queue full, dropping a turn")
+
+    def _rows(self, item):
+        shared = {"session_id": item["session_id"], "query_type": item["query_type"]}
+        rows = [{**shared, "message_text": item["question"], "sender": "user", "created_at": item["asked_at"],
+                 "latency_ms": None}]
+        if item["response"] is not None:
+            rows.append({**shared, "message_text": item["response"], "sender": "bot",
+                         "created_at": item["answered_at"], "latency_ms": item["latency_ms"]})
+        return rows
+
+    def _write(self, rows):
+        for attempt in range(CHAT_LOG_RETRIES):
+            if not self._extra_columns:
+                rows = [{k: v for k, v in row.items() if k not in EXTRA_COLUMNS} for row in rows]
+            try:
+                self.insert_rows(rows)
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                if self._extra_columns and any(col in str(e) for col in EXTRA_COLUMNS):
+                    print(f"ℹ️ chat_messages has no query_type/latency_ms columns; logging without them")
+                    self._extra_columns = False
+                    continue
+                print(f"⚠️ Chat log write failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        self.stats["failed_batches"] += 1
+        self.stats["dropped"] += len(rows)
+
+    def flush(self):
+        """Write everything queued so far (the writer thread calls this too)"""
+        with self._flush_lock:
+            while True:
+                rows = []
+                while len(rows) < self.batch_size:
+                    try:
+                        rows.extend(self._rows(self._queue.get_nowait()))
+                    except queue.Empty:
+                        break
+                if not rows:
+                    return
+                self._write(rows)
+
+    def _run(self):
+        while True:
+            # Woken early by log_turn once a batch is waiting, otherwise every flush_seconds
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def _ensure_thread(self):
+        # Threads don't survive a fork, so each worker starts its own on first use
+        if self._thread and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def snapshot(self):
+        return {**self.stats, "pending": self._queue.qsize()}
@@ -0,0 +1,100 @@
+import re
+
+from md_splitter import SEMESTER_RE, YEAR_RE, YEAR_NUMBERS
+
+# One alternation, scanned once per chunk; the group that matched names the signal
+_SIGNAL_RE = re.compile(
+    r"(?P<semester>semester)"
+    r"|(?P<administration>principal|director|chairman|board)"
+    r"|(?P<admission>eligibility|admission|entrance)"
+    r"|(?P<career>career|job|prospects)"
+    r"|(?P<course>course)"
+    r"|(?P<pipe>\|)",
+    re.IGNORECASE
+)
+
+# Same precedence as the original chained checks
+_CHUNK_TYPE_ORDER = [
+    ("curriculum", {"semester"}),
+    ("administration", {"administration"}),
+    ("admission", {"admission"}),
+    ("career", {"career"}),
+    ("course_table", {"course", "pipe"}),
+]
+
+COURSE_CODE_RE = re.compile(r"\b([A-Z]{2,4})[ -]?(\d{3})\b")
+
+ROLE_RE = re.compile(
+    r"\b(vice[ -]principal|principal|vice[ -]director|director|vice[ -]chairman|chairman|"
+    r"dean|coordinator|registrar|controller|president|secretary|head of department|hod)\b",
+    re.IGNORECASE
+)
+
+_COURSE_QUESTION_RE = re.compile(r"\b(courses?|subjects?|syllabus|curriculum)\b", re.IGNORECASE)
+
+# Chroma metadata values must be str/int/float/bool, so lists are stored comma-joined
+MAX_COURSE_CODES = 40
+
+
+def classify_chunk(text, metadata=None):
+    """Derive chunk_type, semester/year, course codes and role names from one chunk.
+
+    Semester/year already set by the markdown splitter (from headings) win over
+    the first mention in the text.
+    """
+    metadata = metadata or {}
+    signals = {m.lastgroup for m in _SIGNAL_RE.finditer(text)}
+    chunk_type = next(
+        (name for name, needed in _CHUNK_TYPE_ORDER if needed <= signals),
+        "general"
+    )
+
+    semester = metadata.get("semester")
+    if semester is None:
+        m = SEMESTER_RE.search(text)
+        semester = int(m.group(1) or m.group(2)) if m else 0
+    year = metadata.get("year")
+    if year is None:
+        m = YEAR_RE.search(text)
+        year = YEAR_NUMBERS[m.group(1).lower()] if m else 0
+
+    codes = list(dict.fromkeys(a + b for a, b in COURSE_CODE_RE.findall(text)))
+    roles = sorted({r.lower().replace("-", " ") for r in ROLE_RE.findall(text)})
+
+    return {
+        "chunk_type": chunk_type,
+        "semester": semester,
+        "year": year,
+        "course_codes": ",".join(codes[:MAX_COURSE_CODES]),
+        "course_count": len(codes),
+        "roles": ",".join(roles),
+        "has_roles": bool(roles),
+    }
+
+
+def query_filters(question, program=None):
+    """Chroma where-clauses for a question, strictest first, ending with None (unfiltered)"""
+    narrowing = []
+    m = SEMESTER_RE.search(question)
+    if m:
+        narrowing.append({"semester": int(m.group(1) or m.group(2))})
+    m = YEAR_RE.search(question)
+    if m:
+        narrowing.append({"year": YEAR_NUMBERS[m.group(1).lower()]})
+    if COURSE_CODE_RE.search(question) or _COURSE_QUESTION_RE.search(question):
+        narrowing.append({"course_count": {"$gt": 0}})
+    if ROLE_RE.search(question):
+        narrowing.append({"has_roles": True})
+
+    base = [{"program": program}] if program else []
+    filters = []
+    if narrowing:
+        filters.append(_where(base + narrowing))
+    if base:
+        filters.append(_where(base))
+    filters.append(None)
+    return filters
+
+
+def _where(conditions):
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
@@ -0,0 +1,150 @@
+"""Per-session conversation state for follow-up questions.
+
+After each answer the session remembers what the turn resolved to: the
+standalone question, program, semester, the person looked up and the chunks
+retrieved. A short follow-up ("and semester 2?", "what about BCA?", "what is
+her email?", "tell me more") is rewritten into a standalone question from
+that state. When the previous turn's chunks already cover the follow-up they
+are reused instead of running a fresh k=20 retrieval, and a person follow-up
+reuses the record instead of searching the tables again.
+"""
+import re
+
+from md_splitter import SEMESTER_RE
+
+# Longer questions are taken as standalone even if they start with "and"
+FOLLOW_UP_MAX_WORDS = 8
+# Narrowing reuses the previous chunks only if this many match the new semester
+MIN_REUSED_CHUNKS = 3
+
+LEAD_IN_RE = re.compile(r"^\s*(?:and|also|what about|how about|what of|same for|then)\b[\s,]*", re.IGNORECASE)
+MORE_RE = re.compile(
+    r"^\W*(?:tell me more|more (?:details?|info(?:rmation)?)|explain (?:that|it|more)|elaborate|go on|what else)\W*$",
+    re.IGNORECASE
+)
+PRONOUN_RE = re.compile(r"\b(his|her|hers|their|theirs|him|them|he|she|they)\b", re.IGNORECASE)
+_POSSESSIVES = {"his", "her", "hers", "their", "theirs"}
+# Words that don't make a new topic on their own ("and for semester 2?")
+_FILLER = {"the", "a", "an", "for", "in", "of", "about", "its", "it", "one", "too", "then"}
+# "Ram's", or a capitalized word past the first: a name the question brings in itself
+NAME_RE = re.compile(r"\b(\w+)'s\b|(?<=\s)([A-Z][a-z]+)\b")
+
+
+def _semester(text):
+    m = SEMESTER_RE.search(text)
+    return int(m.group(1) or m.group(2)) if m else None
+
+
+def resolve_follow_up(question, state, programs):
+    """Rewrite a follow-up into a standalone turn, or None if question stands on its own.
+
+    state: the previous turn (see remember_turn). programs: the query system's
+    program table, used to swap program keywords.
+    Returns {"question", "docs" (chunks to reuse or None), "person" (record to reuse
+    or None), "documents_only"}.
+    """
+    if not state or len(question.split()) > FOLLOW_UP_MAX_WORDS:
+        return None
+    turn = {"question": None, "docs": None, "person": None, "documents_only": False}
+
+    if MORE_RE.match(question):
+        if not state.get("docs"):
+            return None
+        turn.update(question=state["question"], docs=state["docs"], documents_only=True)
+        return turn
+
+    person = state.get("person")
+    if person and PRONOUN_RE.search(question) and not _names_program(question, programs) \
+            and not _names_other_person(question, person["name"]):
+        name = person["name"].title()
+        turn["question"] = PRONOUN_RE.sub(
+            lambda m: f"{name}'s" if m.group(1).lower() in _POSSESSIVES else name, question
+        )
+        turn["person"] = person
+        return turn
+
+    lead_in = LEAD_IN_RE.match(question)
+    if not lead_in:
+        return None
+    rest = question[lead_in.end():].strip(" ?.!")
+    if not rest:
+        return None
+
+    previous = state["question"]
+    new_program = next((p for p, data in programs.items() if any(kw in rest.lower() for kw in data["keywords"])), None)
+    new_semester = _semester(rest)
+
+    if _topic_of(rest, programs.get(new_program)):
+        # A new topic ("and the fees?", "and BCA eligibility?"): ask it, carrying
+        # over the previous program only when rest names none
+        if new_program:
+            resolved = rest
+        elif state.get("program"):
+            resolved = f"{rest} {programs[state['program']]['keywords'][0]}"
+        elif new_semester:
+            resolved = rest
+        else:
+            return None
+    elif new_program and state.get("program") and new_program != state["program"]:
+        resolved = previous
+        for kw in sorted(programs[state["program"]]["keywords"], key=len, reverse=True):
+            resolved = re.sub(rf"\b{re.escape(kw)}\b", programs[new_program]["keywords"][0], resolved, flags=re.IGNORECASE)
+        if resolved == previous:
+            return None  # the previous question never named its program
+        if new_semester:
+            resolved = _with_semester(resolved, new_semester)
+    elif new_semester and not new_program:
+        resolved = _with_semester(previous, new_semester)
+        # Narrowing: the previous chunks may already hold this semester
+        reusable = [
+            (doc, score) for doc, score in state.get("docs") or []
+            if doc.metadata.get("semester") == new_semester
+        ]
+        if len(reusable) >= MIN_REUSED_CHUNKS:
+            turn["docs"] = reusable
+    else:
+        return None
+
+    turn["question"] = resolved
+    return turn
+
+
+def _topic_of(rest, program_data):
+    """What rest asks about besides a program keyword and a semester ("" for "BCA", "semester 2")"""
+    topic = SEMESTER_RE.sub(" ", rest.lower())
+    for kw in sorted((program_data or {}).get("keywords", []), key=len, reverse=True):
+        topic = re.sub(rf"\b{re.escape(kw)}\b", " ", topic)
+    return " ".join(word for word in re.findall(r"\w+", topic) if word not in _FILLER)
+
+
+def _names_program(question, programs):
+    q_lower = question.lower()
+    return any(kw in q_lower for data in programs.values() for kw in data["keywords"])
+
+
+def _names_other_person(question, name):
+    """Whether question names someone besides name ("what do they teach Ram?" is not about name)"""
+    known = set(name.lower().split())
+    for m in NAME_RE.finditer(question):
+        word = (m.group(1) or m.group(2)).lower()
+        if word not in known and not PRONOUN_RE.fullmatch(word):
+            return True
+    return False
+
+
+def _with_semester(question, semester):
+    if SEMESTER_RE.search(question):
+        return SEMESTER_RE.sub(f"semester {semester}", question, count=1)
+    return f"{question} semester {semester}"
+
+
+def remember_turn(question, program, person=None, docs=None):
+    """The state to keep for the next follow-up"""
+    return {
+        "question": question,
+        "program": program,
+        "semester": _semester(question),
+        "person": person,
+        "docs": docs,
+        "chunk_ids": [doc.metadata.get("chunk_id") for doc, _ in docs or []],
+    }
@@ -1,11 +1,49 @@
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_backends import create_embeddings
+from md_splitter import MarkdownSectionSplitter, missing_words
+from chunk_metadata import classify_chunk
+from vector_index import VectorIndex
+from retrieval_eval import evaluate_vectordb, print_report, check_against_baseline
 import os
+import shutil
+import argparse
+from datetime import datetime
 
-def load_and_process_md_files(directory="data"):
+# "markdown" splits on headings/tables in one pass; "recursive" is the old separator-based splitter
+CHUNKER = os.getenv("CHUNKER", "markdown")
+CHUNKERS = ("markdown", "recursive")
+
+
+def _recursive_splitter(config):
+    """Separator-based splitter with dynamic semester and year separators"""
+    base_separators = config["separators"].copy()
+
+    semester_seps = []
+    for i in range(1, 9):
+        semester_seps.extend([
+            f"\n## Semester {i}",
+            f"\n# Semester {i}",
+            f"\nSemester {i}",
+            f"\n{i} Semester"
+        ])
+
+    year_seps = [f"\n# {year} Year" for year in ["First", "Second", "Third", "Fourth", "Forth"]]
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config["chunk_size"],
+        chunk_overlap=config["chunk_overlap"],
+        separators=base_separators + semester_seps + year_seps,
+        length_function=len,
+        is_separator_regex=False
+    )
+
+
+def load_and_process_md_files(directory="data", chunker=None):
     """Enhanced processing with better chunking strategies"""
+    chunker = chunker or CHUNKER
+    if chunker not in CHUNKERS:
+        raise ValueError(f"Unknown CHUNKER '{chunker}', expected one of {list(CHUNKERS)}")
     all_texts = []
     
     # Enhanced program configuration
@@ -50,55 +88,24 @@ def load_and_process_md_files(directory="data"):
                 loader = TextLoader(f"{directory}/{filename}", encoding='utf-8')
                 documents = loader.load()
                 
-                # Enhanced separators
-                base_separators = config["separators"].copy()
-                
-                # Add dynamic semester and section separators
-                semester_seps = []
-                for i in range(1, 9):
-                    semester_seps.extend([
-                        f"\n## Semester {i}",
-                        f"\n# Semester {i}",
-                        f"\nSemester {i}",
-                        f"\n{i} Semester"
-                    ])
-                
-                year_seps = [f"\n# {year} Year" for year in ["First", "Second", "Third", "Fourth", "Forth"]]
-                
-                all_separators = base_separators + semester_seps + year_seps
-                
-                text_splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=config["chunk_size"],
-                    chunk_overlap=config["chunk_overlap"],
-                    separators=all_separators,
-                    length_function=len,
-                    is_separator_regex=False
-                )
-                
+                if chunker == "markdown":
+                    text_splitter = MarkdownSectionSplitter(chunk_size=config["chunk_size"])
+                else:
+                    text_splitter = _recursive_splitter(config)
                 texts = text_splitter.split_documents(documents)
+                if chunker == "markdown":
+                    lost = missing_words(documents[0].page_content, [(t.page_content, None) for t in texts])
+                    if lost:
+                        print(f"⚠️ {filename}: {sum(lost.values())} words missing from the chunks, "
+                              f"e.g. {list(lost)[:5]}")
                 
                 # Enhanced metadata
                 for i, text in enumerate(texts):
-                    content = text.page_content.lower()
-                    
-                    # Determine chunk type
-                    chunk_type = "general"
-                    if "semester" in content:
-                        chunk_type = "curriculum"
-                    elif any(word in content for word in ["principal", "director", "chairman", "board"]):
-                        chunk_type = "administration"
-                    elif any(word in content for word in ["eligibility", "admission", "entrance"]):
-                        chunk_type = "admission"
-                    elif any(word in content for word in ["career", "job", "prospects"]):
-                        chunk_type = "career"
-                    elif "course" in content and "|" in content:
-                        chunk_type = "course_table"
-                    
+                    text.metadata.update(classify_chunk(text.page_content, text.metadata))
                     text.metadata.update({
                         "program": program,
                         "source": filename,
                         "chunk_id": i,
-                        "chunk_type": chunk_type,
                         "content_preview": text.page_content[:100].replace('\n', ' ')
                     })
                 
@@ -114,58 +121,44 @@ def load_and_process_md_files(directory="data"):
     
     return all_texts
 
-def create_vector_store(texts):
-    """Create enhanced vector database with better configuration"""
+def create_vector_store(texts, persist_directory="db", programs=None, layout=None):
+    """Create enhanced vector database with better configuration.
+
+    programs: with INDEX_LAYOUT=per_program, rebuild only these programs' collections.
+    """
     print("🔧 Initializing embedding model...")
     
-    embedding = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={
-            'normalize_embeddings': True,
-            'batch_size': 32
-        }
-    )
+    # Only chunks whose text changed since the last run get re-embedded.
+    # The index must be rebuilt with the same EMBEDDING_BACKEND the server uses.
+    embedding = create_embeddings(encode_kwargs={'batch_size': 32})
     
-    print("📦 Creating vector database...")
-    
-    # Remove existing database
-    import shutil
-    if os.path.exists("db"):
-        shutil.rmtree("db")
-        print("🗑️  Removed existing database")
-    
-    # Create new database with enhanced settings
-    vectordb = Chroma.from_documents(
-        documents=texts,
-        embedding=embedding,
-        persist_directory="db",
-        collection_metadata={
-            "hnsw:space": "cosine",
-            "description": "Enhanced Samriddhi College information database"
-        }
-    )
+    index = VectorIndex(persist_directory, embedding, layout)
+    print(f"📦 Creating vector database ({index.layout} layout)...")
+    index.build(texts, programs)
     
     print("💾 Vector database created successfully!")
     
-    # Test the database
-    print("\n🧪 Testing database retrieval...")
-    test_queries = [
-        "principal of samriddhi college",
-        "CSIT semester 1 courses",
-        "BCA eligibility criteria"
-    ]
-    
-    for query in test_queries:
-        try:
-            results = vectordb.similarity_search(query, k=3)
-            print(f"   Query: '{query}' → Found {len(results)} results")
-            if results:
-                print(f"      Top result preview: {results[0].page_content[:80]}...")
-        except Exception as e:
-            print(f"   Query: '{query}' → Error: {e}")
-    
-    return vectordb
+    return index
+
+def _staging_directory(persist_directory, programs=None):
+    """Fresh sibling directory to build into; a partial rebuild starts from a copy of the live index"""
+    staging = f"{persist_directory}.staging"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    if programs and os.path.exists(persist_directory):
+        shutil.copytree(persist_directory, staging)
+    return staging
+
+def _swap_in(staging, persist_directory):
+    """Replace the live index with the staged one (same filesystem, so both renames are atomic)"""
+    previous = f"{persist_directory}.previous"
+    if os.path.exists(previous):
+        shutil.rmtree(previous)
+    if os.path.exists(persist_directory):
+        os.rename(persist_directory, previous)
+    os.rename(staging, persist_directory)
+    if os.path.exists(previous):
+        shutil.rmtree(previous)
 
 def analyze_database_content(vectordb):
     """Analyze what's in the database for debugging"""
@@ -194,6 +187,11 @@ def analyze_database_content(vectordb):
         print(f"   Analysis failed: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Chroma index from data/*.md")
+    parser.add_argument("programs", nargs="*",
+                        help="with INDEX_LAYOUT=per_program, re-index only these programs (e.g. csit bca)")
+    args = parser.parse_args()
+
     print("🚀 Starting Enhanced Database Creation Process")
     print("=" * 60)
     
@@ -210,7 +208,7 @@ if __name__ == "__main__":
         exit(1)
     
     print(f"📋 Found {len(md_files)} markdown files: {md_files}")
-    print("\n🔄 Processing documents...")
+    print(f"\n🔄 Processing documents ({CHUNKER} chunker)...")
     
     texts = load_and_process_md_files()
     
@@ -220,9 +218,30 @@ if __name__ == "__main__":
     
     print(f"\n✅ Successfully processed {len(texts)} text chunks")
     
-    db = create_vector_store(texts)
+    # Build next to the live index; the server keeps using db/ until the new one passes
+    staging = _staging_directory("db", args.programs)
+    db = create_vector_store(texts, persist_directory=staging, programs=args.programs or None)
     analyze_database_content(db)
-    
+
+    # Labelled retrieval checks; a drop against the saved baseline keeps the old index
+    report = evaluate_vectordb(db, persist_directory=staging)
+    print_report(report)
+    retrieval_ok = check_against_baseline(report)
+    
+    db.embedding.cache.flush()
+    print(f"🧮 Embedding cache: {db.embedding.cache.stats()}")
+    del db
+
+    if not retrieval_ok:
+        shutil.rmtree(staging)
+        print("❌ Retrieval quality regressed compared to retrieval_baseline.json; db/ left unchanged")
+        exit(1)
+
+    _swap_in(staging, "db")
+    # Running gunicorn masters watch this file and restart their workers
+    with open(os.path.join("db", "INDEX_VERSION"), "w", encoding="utf-8") as f:
+        f.write(datetime.now().isoformat())
+
     print("\n" + "=" * 60)
     print("🎉 Database creation completed successfully!")
     print(f"📂 Database location: {os.path.abspath('db')}")
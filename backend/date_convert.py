@@ -0,0 +1,116 @@
+"""AD <-> BS date conversion from a precomputed month table.
+
+nepali_datetime walks its calendar on every conversion. The table holds one
+entry per BS month over the supported range (about 1,500 months): the
+ordinal of the month's first AD day and its length. A conversion is then a
+dict lookup (BS -> AD) or a bisect (AD -> BS).
+"""
+import re
+import bisect
+import threading
+from datetime import date
+
+import nepali_datetime
+
+DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+CONVERT_MAX_ITEMS = 5000
+
+_table = None
+_table_lock = threading.Lock()
+
+
+class _MonthTable:
+    def __init__(self):
+        self.starts = []   # AD ordinal of day 1 of each BS month, ascending
+        self.months = []   # (bs_year, bs_month) aligned with starts
+        self.by_month = {}  # (bs_year, bs_month) -> (start ordinal, length)
+
+        for year in range(nepali_datetime.MINYEAR, nepali_datetime.MAXYEAR + 1):
+            for month in range(1, 13):
+                start = nepali_datetime.date(year, month, 1).to_datetime_date().toordinal()
+                self.starts.append(start)
+                self.months.append((year, month))
+        self.last_ordinal = nepali_datetime.date.max.to_datetime_date().toordinal()
+
+        ends = self.starts[1:] + [self.last_ordinal + 1]
+        for key, start, end in zip(self.months, self.starts, ends):
+            self.by_month[key] = (start, end - start)
+
+    def ad_to_bs(self, ad):
+        ordinal = ad.toordinal()
+        if not self.starts[0] <= ordinal <= self.last_ordinal:
+            raise ValueError(f"AD date {ad.isoformat()} is outside the supported range")
+        i = bisect.bisect_right(self.starts, ordinal) - 1
+        year, month = self.months[i]
+        return f"{year:04d}-{month:02d}-{ordinal - self.starts[i] + 1:02d}"
+
+    def bs_to_ad(self, year, month, day):
+        if not 1 <= month <= 12:
+            raise ValueError("Invalid BS date")
+        entry = self.by_month.get((year, month))
+        if entry is None:
+            raise ValueError("BS date is outside the supported range")
+        start, length = entry
+        if not 1 <= day <= length:
+            raise ValueError("Invalid BS date")
+        return date.fromordinal(start + day - 1).isoformat()
+
+
+def _get_table():
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = _MonthTable()
+    return _table
+
+
+def ad_to_bs(ad_date_str):
+    """'2023-04-14' -> '2080-01-01'; raises ValueError on a bad or unsupported date"""
+    match = DATE_RE.match(str(ad_date_str or "").strip())
+    if not match:
+        raise ValueError("AD date must be in YYYY-MM-DD format")
+    ad = date(*map(int, match.groups()))
+    return _get_table().ad_to_bs(ad)
+
+
+def bs_to_ad(bs_date_str):
+    """'2080-01-01' -> '2023-04-14'; raises ValueError on a bad or unsupported date"""
+    match = DATE_RE.match(str(bs_date_str or "").strip())
+    if not match:
+        raise ValueError("BS date must be in YYYY-MM-DD format")
+    return _get_table().bs_to_ad(*map(int, match.groups()))
+
+
+def convert_many(values, direction):
+    """Convert a list of date strings; one {input, output} or {input, error} per value"""
+    convert = ad_to_bs if direction == "ad-to-bs" else bs_to_ad
+    source, target = ("ad_date", "bs_date") if direction == "ad-to-bs" else ("bs_date", "ad_date")
+    results = []
+    for value in values:
+        try:
+            results.append({source: value, target: convert(value)})
+        except ValueError as e:
+            results.append({source: value, "error": str(e)})
+    return results
+
+
+def verify():
+    """Check every day of the supported range against nepali_datetime; returns mismatches"""
+    table = _get_table()
+    mismatches = []
+    for ordinal in range(table.starts[0], table.last_ordinal + 1):
+        ad = date.fromordinal(ordinal)
+        expected = nepali_datetime.date.from_datetime_date(ad).strftime("%Y-%m-%d")
+        if table.ad_to_bs(ad) != expected or bs_to_ad(expected) != ad.isoformat():
+            mismatches.append((ad.isoformat(), expected))
+    return mismatches
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    _get_table()
+    print(f"Table built in {(time.perf_counter() - start) * 1000:.1f}ms ({len(_table.months)} months)")
+    bad = verify()
+    print(f"{len(bad)} mismatches" + (f", first: {bad[:5]}" if bad else " against nepali_datetime"))
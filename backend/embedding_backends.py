@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from embedding_cache import CachedEmbeddings
+
+# ---------------- Embedding backend config ----------------
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Pre-exported int8 graph shipped in the all-MiniLM-L6-v2 hub repo (use *_arm64 on ARM)
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx2.onnx")
+
+BACKENDS = {
+    "torch": {},
+    "onnx": {"backend": "onnx", "model_kwargs": {"file_name": "onnx/model.onnx"}},
+    "onnx-int8": {"backend": "onnx", "model_kwargs": {"file_name": EMBEDDING_ONNX_FILE}},
+}
+
+SAMPLE_TEXTS = [
+    "principal of samriddhi college",
+    "CSIT semester 1 courses",
+    "BCA eligibility criteria",
+    "how many seats are there in BSW",
+    "career prospects after BBS",
+    "who teaches data structures",
+    "admission process and fees",
+    "library and lab facilities",
+]
+
+
+def create_embeddings(backend=None, cached=True, encode_kwargs=None):
+    """Build the configured embedding backend, wrapped in the on-disk cache"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {list(BACKENDS)}")
+
+    model_kwargs = {'device': 'cpu'}
+    model_kwargs.update(BACKENDS[backend])
+    kwargs = {'normalize_embeddings': True}
+    kwargs.update(encode_kwargs or {})
+
+    embedding = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs=model_kwargs,
+        encode_kwargs=kwargs
+    )
+    if not cached:
+        return embedding
+    # Backends disagree in the last few bits, so each gets its own cache file
+    cache_key = EMBEDDING_MODEL if backend == "torch" else f"{EMBEDDING_MODEL}@{backend}"
+    return CachedEmbeddings(embedding, cache_key)
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+
+def _load_texts(directory="data", limit=200):
+    """Sample chunk-sized texts from the markdown corpus, falling back to SAMPLE_TEXTS"""
+    texts = []
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.md'):
+                with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                    texts.extend(p.strip() for p in f.read().split('\n\n') if len(p.strip()) > 20)
+    return texts[:limit] + SAMPLE_TEXTS
+
+
+def validate(backend, threshold=0.98):
+    """Compare a backend against the reference torch model by cosine similarity"""
+    texts = _load_texts()
+    reference = create_embeddings("torch", cached=False).embed_documents(texts)
+    candidate = create_embeddings(backend, cached=False).embed_documents(texts)
+
+    scores = sorted(_cosine(a, b) for a, b in zip(reference, candidate))
+    report = {
+        "backend": backend,
+        "texts": len(texts),
+        "mean_cosine": round(sum(scores) / len(scores), 5),
+        "min_cosine": round(scores[0], 5),
+        "p05_cosine": round(scores[int(len(scores) * 0.05)], 5),
+        "threshold": threshold,
+        "passed": scores[0] >= threshold,
+    }
+    print(json.dumps(report, indent=2))
+    return report["passed"]
+
+
+def _bench_one(backend, rounds=50):
+    """Measure load time, query latency and peak RSS for one backend in this process"""
+    start = time.perf_counter()
+    embedding = create_embeddings(backend, cached=False)
+    embedding.embed_query("warm up")
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for i in range(rounds):
+        text = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]
+        t0 = time.perf_counter()
+        embedding.embed_query(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    # ru_maxrss is reported in KB on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "query_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+
+def benchmark(backends):
+    """Benchmark each backend in a fresh process so RSS numbers don't overlap"""
+    results = []
+    for backend in backends:
+        out = subprocess.run(
+            [sys.executable, __file__, "_bench_one", backend],
+            capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            print(f"❌ {backend}: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else 'failed'}")
+            continue
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'backend':<12}{'load s':>10}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>10}")
+    for r in results:
+        print(f"{r['backend']:<12}{r['load_s']:>10}{r['query_p50_ms']:>10}{r['query_p95_ms']:>10}{r['peak_rss_mb']:>10}")
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "validate":
+        ok = validate(sys.argv[2] if len(sys.argv) > 2 else "onnx-int8")
+        sys.exit(0 if ok else 1)
+    elif command == "bench":
+        benchmark(sys.argv[2:] or list(BACKENDS))
+    elif command == "_bench_one":
+        print(json.dumps(_bench_one(sys.argv[2])))
+    else:
+        print("Usage: python embedding_backends.py [validate <backend> | bench [backend ...]]")
+        sys.exit(2)
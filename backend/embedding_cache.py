@@ -0,0 +1,349 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import atexit
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ---------------- Cache config ----------------
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+# Query vectors are written by a background thread this often (or sooner once
+# _WRITE_BATCH are waiting), never on the request thread
+EMBEDDING_CACHE_FLUSH_SECONDS = float(os.getenv("EMBEDDING_CACHE_FLUSH_SECONDS", "2"))
+
+# Cache hits only mark entries as used in memory; the marks are written out
+# with the next put or after this many hits, whichever comes first
+_TOUCH_BATCH = 256
+_WRITE_BATCH = 64
+# A full cache drops this share of its entries at once, so eviction runs rarely
+_EVICT_FRACTION = 0.1
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _model_slug(model_name):
+    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", model_name)
+
+
+class EmbeddingCache:
+    """On-disk embedding cache in SQLite, safe to share between processes.
+
+    Gunicorn workers and create_database.py use the same file at once, so the
+    store is SQLite in WAL mode: readers never block, writers are serialized by
+    SQLite's own lock, and every row is written whole. Vectors are keyed by the
+    SHA-256 of the chunk text and stored per model, so switching models never
+    returns stale vectors. When the cache is full the least recently used
+    tenth is evicted in one go.
+
+    Lookups read through one connection; writes go through a second one under
+    their own lock, so a write transaction never blocks a lookup. The row count
+    is tracked from this process's own inserts and only recounted when it
+    passes max_entries; other processes' inserts are seen at that recount, so
+    the limit is approximate.
+    """
+
+    def __init__(self, model_name, cache_dir=EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.db_path = os.path.join(cache_dir, f"{_model_slug(model_name)}.sqlite3")
+
+        self._lock = threading.Lock()  # in-memory state and the read connection
+        self._write_lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._write_conn = None
+        self._write_pid = None
+        self._rows = None  # entries in the file as far as this process knows
+        self._touched = {}  # text hash -> last used (time.time()), not yet written
+        self._pending = {}  # text hash -> row queued by put_later, not yet written
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self.hits = 0
+        self.misses = 0
+
+        atexit.register(self.flush)
+
+    # ---------- storage ----------
+    def _connect(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " hash TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL, crc INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+        return conn
+
+    def _db(self):
+        """This process's read connection (call with _lock held); never reused across fork"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn, self._pid = self._connect(), os.getpid()
+            self._touched, self._pending = {}, {}
+        return self._conn
+
+    def _writer_db(self):
+        """This process's write connection (call with _write_lock held)"""
+        if self._write_conn is None or self._write_pid != os.getpid():
+            self._write_conn, self._write_pid = self._connect(), os.getpid()
+            self._rows = None
+        return self._write_conn
+
+    def _evict_if_full(self, conn):
+        if self._rows is None:
+            self._rows = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if self._rows <= self.max_entries:
+            return
+        # Other processes insert too: recount before deciding what to drop
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.max_entries:
+            target = int(self.max_entries * (1 - _EVICT_FRACTION))
+            conn.execute(
+                "DELETE FROM embeddings WHERE hash IN (SELECT hash FROM embeddings ORDER BY used LIMIT ?)",
+                (count - target,)
+            )
+            count = target
+        self._rows = count
+
+    def _write(self, rows):
+        """Insert [(hash, row)] and the pending used-marks in one transaction"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not rows and not touched:
+            return
+        with self._write_lock:
+            conn = self._writer_db()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if rows:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (hash, model, dim, vector, crc, used) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(h, *row) for h, row in rows]
+                    )
+                if touched:
+                    conn.executemany("UPDATE embeddings SET used = ? WHERE hash = ?",
+                                     [(used, h) for h, used in touched.items()])
+                if self._rows is not None:
+                    # Replacements count too; that only brings the recount forward
+                    self._rows += len(rows)
+                self._evict_if_full(conn)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # A cache write failing must never fail the query
+                print(f"⚠️ Embedding cache write failed: {e}")
+
+    def flush(self):
+        """Write queued vectors and used-marks"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            pending, self._pending = self._pending, {}
+        self._write(list(pending.items()))
+
+    # ---------- lookups ----------
+    def get_many(self, texts):
+        """Return a list of cached vectors (or None) aligned with texts"""
+        hashes = [_text_hash(t) for t in texts]
+        with self._lock:
+            conn = self._db()
+            found = {h: np.frombuffer(self._pending[h][2], dtype=np.float32).tolist()
+                     for h in hashes if h in self._pending}
+            unique = [h for h in dict.fromkeys(hashes) if h not in found]
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT hash, vector, crc FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                    [self.model_name, *part]
+                ).fetchall()
+                for h, blob, crc in rows:
+                    if zlib.crc32(blob) == crc:
+                        found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            now = time.time()
+            results = []
+            for h in hashes:
+                vec = found.get(h)
+                if vec is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._touched[h] = now
+                results.append(vec)
+            flush_touches = len(self._touched) >= _TOUCH_BATCH
+
+        if flush_touches:
+            self._ensure_writer()
+            self._wake.set()
+        return results
+
+    def _rows_for(self, texts, vectors):
+        now = time.time()
+        rows = {}
+        for t, v in zip(texts, vectors):
+            arr = np.asarray(v, dtype=np.float32)
+            blob = arr.tobytes()
+            rows[_text_hash(t)] = (self.model_name, len(arr), blob, zlib.crc32(blob), now)
+        return list(rows.items())[-self.max_entries:]
+
+    def put_many(self, texts, vectors):
+        """Store vectors for texts now (index builds), evicting least recently used entries when full"""
+        if texts:
+            self._write(self._rows_for(texts, vectors))
+
+    def put_later(self, texts, vectors):
+        """Queue vectors for the background writer; lookups see them straight away"""
+        if not texts:
+            return
+        self._ensure_writer()
+        with self._lock:
+            self._db()
+            self._pending.update(self._rows_for(texts, vectors))
+            if len(self._pending) >= _WRITE_BATCH:
+                self._wake.set()
+
+    def _ensure_writer(self):
+        # Threads don't survive a fork, so each worker starts its own on first use
+        if self._thread and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._write_lock:
+            if self._thread and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+
+            def _run():
+                while True:
+                    self._wake.wait(EMBEDDING_CACHE_FLUSH_SECONDS)
+                    self._wake.clear()
+                    self.flush()
+
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=_run, name="embedding-cache-writer", daemon=True)
+            self._thread.start()
+
+    # ---------- maintenance ----------
+    def verify(self, repair=False):
+        """Check stored vectors (checksum, dimension, finite values); optionally drop bad entries"""
+        problems, bad = [], []
+        with self._lock:
+            conn = self._db()
+            for h, model, dim, blob, crc in conn.execute("SELECT hash, model, dim, vector, crc FROM embeddings"):
+                vec = np.frombuffer(blob, dtype=np.float32)
+                if model != self.model_name:
+                    problem = f"belongs to model {model}"
+                elif zlib.crc32(blob) != crc:
+                    problem = "checksum mismatch"
+                elif len(vec) != dim:
+                    problem = f"{len(vec)} values, expected {dim}"
+                elif not np.all(np.isfinite(vec)):
+                    problem = "non-finite values"
+                else:
+                    continue
+                problems.append(f"{h[:12]}: {problem}")
+                bad.append(h)
+        if repair and bad:
+            with self._write_lock:
+                conn = self._writer_db()
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("DELETE FROM embeddings WHERE hash = ?", [(h,) for h in bad])
+                conn.execute("COMMIT")
+                self._rows = None
+        return problems
+
+    def count(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        with self._lock:
+            row = self._db().execute("SELECT COUNT(*), MAX(dim) FROM embeddings").fetchone()
+        return {
+            "model": self.model_name,
+            "entries": row[0],
+            "capacity": self.max_entries,
+            "dim": row[1],
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending": len(self._pending),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(model_name):
+    """Process-wide cache per model, shared by every CachedEmbeddings instance"""
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings wrapper that only computes vectors for unseen text"""
+
+    def __init__(self, base_embeddings, model_name, cache=None):
+        self.base = base_embeddings
+        self.cache = cache or get_cache(model_name)
+
+    def embed_documents(self, texts):
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vec in enumerate(cached) if vec is None]
+
+        unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+        if unique_texts:
+            # Embed each distinct unseen text once
+            new_vectors = self.base.embed_documents(unique_texts)
+            self.cache.put_many(unique_texts, new_vectors)
+            by_text = dict(zip(unique_texts, new_vectors))
+            for i in missing:
+                cached[i] = list(by_text[texts[i]])
+        return cached
+
+    def embed_query(self, text):
+        vec = self.cache.get_many([text])[0]
+        if vec is not None:
+            return vec
+        vec = self.base.embed_query(text)
+        self.cache.put_later([text], [vec])
+        return list(vec)
+
+
+def _main(argv):
+    command = argv[1] if len(argv) > 1 else "stats"
+    model_name = argv[2] if len(argv) > 2 else "sentence-transformers/all-MiniLM-L6-v2"
+    cache = EmbeddingCache(model_name)
+
+    if command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif command in ("verify", "repair"):
+        problems = cache.verify(repair=(command == "repair"))
+        for p in problems:
+            print(f"❌ {p}")
+        if problems:
+            print(f"❌ {len(problems)} problem(s) found" + (" and removed" if command == "repair" else ""))
+            return 1 if command == "verify" else 0
+        print(f"✅ Embedding cache OK ({cache.count()} vectors)")
+    else:
+        print("Usage: python embedding_cache.py [stats|verify|repair] [model_name]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,86 @@
+"""Local stand-in for the Groq chat completions API, for resilience and load testing.
+
+    python fake_llm_server.py --latency 3 --failure-rate 0.3
+    GROQ_API_BASE=http://127.0.0.1:5055 GROQ_API_KEY=fake python server.py
+
+Latency and failure rate can be changed while running:
+    curl -X POST localhost:5055/_config -H 'Content-Type: application/json' -d '{"failure_rate": 1}'
+"""
+import time
+import uuid
+import random
+import argparse
+
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+settings = {"latency": 0.0, "jitter": 0.0, "failure_rate": 0.0, "status": 503}
+counters = {"requests": 0, "failed": 0}
+# System messages seen so far, to mimic provider-side prefix caching in usage
+_seen_prefixes = set()
+
+
+@app.route('/openai/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    counters["requests"] += 1
+    body = request.get_json() or {}
+    time.sleep(max(0.0, settings["latency"] + random.uniform(-settings["jitter"], settings["jitter"])))
+
+    if random.random() < settings["failure_rate"]:
+        counters["failed"] += 1
+        return jsonify({"error": {"message": "injected failure", "type": "server_error"}}), settings["status"]
+
+    question = ""
+    for message in body.get("messages", []):
+        if "Question:" in str(message.get("content", "")):
+            question = message["content"].split("Question:", 1)[1].split("\n", 1)[0].strip()
+    answer = f"(fake {body.get('model', 'model')}) Answer to: {question or 'your question'}"
+
+    # Rough token counts: words. A system message sent before counts as cached
+    messages = body.get("messages", [])
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    system = "".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    cached_tokens = len(system.split()) if system and system in _seen_prefixes else 0
+    if system:
+        _seen_prefixes.add(system)
+    completion_tokens = len(answer.split())
+
+    return jsonify({
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+    })
+
+
+@app.route('/_config', methods=['GET', 'POST'])
+def config():
+    if request.method == 'POST':
+        for key, value in (request.get_json() or {}).items():
+            if key in settings:
+                settings[key] = type(settings[key])(value)
+    return jsonify({"settings": settings, "counters": counters})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Groq endpoint with injectable latency and failures")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--status", type=int, default=503, help="HTTP status for injected failures")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, status=args.status)
+    print(f"🧪 Fake LLM on http://127.0.0.1:{args.port} with {settings}")
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
@@ -0,0 +1,85 @@
+import os
+import signal
+import threading
+import time
+
+# ---------------- Worker config ----------------
+bind = os.getenv("BIND", "127.0.0.1:5000")
+workers = int(os.getenv("WEB_WORKERS", "2"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+pidfile = os.getenv("GUNICORN_PIDFILE", "gunicorn.pid")
+
+# Load CollegeQuerySystem in the master so workers share the model memory
+preload_app = True
+
+# Rebuilding the index (create_database.py) bumps this file; workers are then
+# restarted one generation at a time so they reopen the new Chroma segment.
+INDEX_VERSION_FILE = os.getenv("INDEX_VERSION_FILE", os.path.join("db", "INDEX_VERSION"))
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", "10"))
+
+# Keep torch from starting one intra-op thread per core in every worker
+os.environ.setdefault("OMP_NUM_THREADS", str(max(1, threads)))
+os.environ.setdefault("WARMUP_ON_START", "false")
+
+
+def _index_version():
+    try:
+        with open(INDEX_VERSION_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def when_ready(server):
+    def _watch_index():
+        current = _index_version()
+        while True:
+            time.sleep(INDEX_POLL_SECONDS)
+            latest = _index_version()
+            if latest and latest != current:
+                server.log.info(f"Vector index changed ({current} -> {latest}), reloading workers")
+                current = latest
+                # HUP: start new workers, then gracefully stop the old ones
+                os.kill(os.getpid(), signal.SIGHUP)
+
+    threading.Thread(target=_watch_index, name="index-watcher", daemon=True).start()
+
+
+def post_fork(server, worker):
+    # The Chroma client (and its SQLite handle) must not be shared across
+    # processes; drop the inherited one so each worker opens its own.
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except Exception as e:
+        server.log.warning(f"Could not reset Chroma client cache: {e}")
+
+
+def post_worker_init(worker):
+    # The worker's fresh Chroma client starts cold; load the HNSW segments
+    # before the worker takes its first request.
+    try:
+        from server import get_query_system
+        seconds = get_query_system().index.warm_up()
+        worker.log.info(f"Vector index warmed up in {seconds:.2f}s")
+    except Exception as e:
+        worker.log.warning(f"Vector index warm-up failed: {e}")
+
+    # Threads don't survive the fork, so each worker starts its own change poller
+    try:
+        from invalidation import start_poller
+        start_poller()
+    except Exception as e:
+        worker.log.warning(f"Invalidation poller failed to start: {e}")
+
+
+def worker_exit(server, worker):
+    # Write out chat messages still waiting in the write-behind queue
+    try:
+        from server import chat_log
+        chat_log.flush()
+    except Exception as e:
+        server.log.warning(f"Chat log flush on exit failed: {e}")
@@ -0,0 +1,72 @@
+"""Recall/latency sweep over HNSW parameters on our own corpus.
+
+    python hnsw_sweep.py                         # default grid
+    python hnsw_sweep.py --m 8 16 --search-ef 10 50 100
+
+Each (M, construction_ef, search_ef) combination is indexed into a throwaway
+directory (embeddings come from the on-disk cache, so rebuilds are cheap) and
+scored with retrieval_eval.jsonl. Recall is measured against the labels, so it
+also shows how far approximate search is from the best the embeddings can do.
+Pick a point and set HNSW_M / HNSW_CONSTRUCTION_EF / HNSW_SEARCH_EF before
+running create_database.py.
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import itertools
+
+from create_database import load_and_process_md_files
+from embedding_backends import create_embeddings
+from retrieval_eval import EVAL_FILE, load_labels, evaluate
+from vector_index import VectorIndex
+
+
+def sweep(m_values, construction_efs, search_efs, directory="data", labels_path=EVAL_FILE):
+    texts = load_and_process_md_files(directory)
+    labels = load_labels(labels_path)
+    embedding = create_embeddings()
+
+    results = []
+    for m, construction_ef, search_ef in itertools.product(m_values, construction_efs, search_efs):
+        hnsw = {"hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef}
+        persist_directory = tempfile.mkdtemp(prefix="hnsw_sweep_")
+        try:
+            index = VectorIndex(persist_directory, embedding, hnsw=hnsw).build(texts)
+            report = evaluate(index.similarity_search, labels, persist_directory, index.count())
+        finally:
+            shutil.rmtree(persist_directory, ignore_errors=True)
+        results.append({
+            "M": m,
+            "construction_ef": construction_ef,
+            "search_ef": search_ef,
+            "recall@3": report["recall@3"],
+            "recall@10": report["recall@10"],
+            "mrr": report["mrr"],
+            "mean_latency_ms": report["mean_latency_ms"],
+            "p95_latency_ms": report["p95_latency_ms"],
+        })
+
+    columns = list(results[0]) if results else []
+    print("\n" + "".join(f"{c:>16}" for c in columns))
+    for r in results:
+        print("".join(f"{str(r[c]):>16}" for c in columns))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep HNSW parameters")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--labels", default=EVAL_FILE)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data):
+        parser.error(f"data directory '{args.data}' not found")
+    results = sweep(args.m, args.construction_ef, args.search_ef, args.data, args.labels)
+    if args.json:
+        print(json.dumps(results, indent=2))
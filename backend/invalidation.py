@@ -0,0 +1,225 @@
+"""Process-wide cache invalidation bus.
+
+Caches subscribe to a table; writers publish an event when rows change.
+Admin CRUD routes publish directly. A per-process poller picks up everything
+else: changes made by other gunicorn workers, fill.py and edits in the
+Supabase dashboard. It reads rows whose updated_at moved forward and falls
+back to a row-count check for deletes and tables without that column.
+
+    bus.subscribe("students_data", lambda event: cache.invalidate())
+    bus.publish("students_data", ids=[student_id], op="update")
+
+A table counts as tracked (bus.is_tracked) only while the poller follows its
+updated_at; row counts miss edits made elsewhere, so caches keep their short
+TTLs for untracked tables. The updated_at column does not exist in the
+current schema; until it does, every table stays untracked.
+
+Tests and local runs can drive the poller with LocalChangeSource (or any
+object with changed_since() and count()) instead of SupabaseChangeSource.
+"""
+import os
+import threading
+import time
+
+import requests
+
+INVALIDATION_POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "5"))
+INVALIDATION_UPDATED_AT_COLUMN = os.getenv("INVALIDATION_UPDATED_AT_COLUMN", "updated_at")
+WATCHED_TABLES = ["students_data", "teachers_data"]
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}  # table -> [handler(event)]
+        self._tracked = set()
+        self.published = 0
+
+    def subscribe(self, table, handler):
+        with self._lock:
+            self._handlers.setdefault(table, []).append(handler)
+
+    def publish(self, table, ids=None, op="update", source="local"):
+        """Tell every subscriber of table that rows changed; ids=None means 'anything may have'"""
+        event = {"table": table, "ids": list(ids) if ids else None, "op": op, "source": source}
+        with self._lock:
+            handlers = list(self._handlers.get(table, []))
+            self.published += 1
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"⚠️ Invalidation handler for {table} failed: {e}")
+
+    def is_tracked(self, table):
+        """True while every change to table, wherever it is made, arrives as an event"""
+        return table in self._tracked
+
+    def set_tracked(self, table, tracked):
+        with self._lock:
+            was = table in self._tracked
+            if tracked:
+                self._tracked.add(table)
+            else:
+                self._tracked.discard(table)
+        if was and not tracked:
+            # Entries cached under the long TTLs may have missed changes
+            self.publish(table, ids=None, op="untracked", source="poller")
+
+    def snapshot(self):
+        with self._lock:
+            return {"published": self.published, "tables": {t: len(h) for t, h in self._handlers.items()},
+                    "tracked": sorted(self._tracked)}
+
+
+class SupabaseChangeSource:
+    """Reads change markers from PostgREST: rows with a newer updated_at, and the row count"""
+
+    def __init__(self, url=None, key=None, column=INVALIDATION_UPDATED_AT_COLUMN):
+        self.url = url or os.getenv("SUPABASE_URL")
+        key = key or os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.column = column
+        self.session = requests.Session()
+
+    def changed_since(self, table, since, limit=500):
+        """[(id, updated_at)] newer than since (everything's latest when since is None)"""
+        params = {"select": f"id,{self.column}", "limit": limit}
+        if since is None:
+            params.update({"order": f"{self.column}.desc.nullslast", "limit": 1})
+        else:
+            params.update({self.column: f"gt.{since}", "order": f"{self.column}.asc"})
+        resp = self.session.get(f"{self.url}/rest/v1/{table}", headers=self.headers, params=params, timeout=10)
+        resp.raise_for_status()
+        return [(row["id"], row.get(self.column)) for row in resp.json()]
+
+    def count(self, table):
+        resp = self.session.head(
+            f"{self.url}/rest/v1/{table}",
+            headers={**self.headers, "Prefer": "count=exact"},
+            params={"select": "id", "limit": 1},
+            timeout=10
+        )
+        resp.raise_for_status()
+        return int(resp.headers.get("Content-Range", "*/0").rsplit("/", 1)[1])
+
+
+class LocalChangeSource:
+    """In-memory change source for tests and local runs: call touch()/delete() where a write happens"""
+
+    def __init__(self, updated_at=True):
+        self.updated_at = updated_at  # False behaves like a table without the column
+        self._rows = {}  # table -> {id: updated_at}
+        self._clock = 0
+
+    def touch(self, table, row_id):
+        self._clock += 1
+        self._rows.setdefault(table, {})[row_id] = f"{self._clock:012d}"
+
+    def delete(self, table, row_id):
+        self._rows.get(table, {}).pop(row_id, None)
+
+    def changed_since(self, table, since, limit=500):
+        if not self.updated_at:
+            raise RuntimeError(f"column {table}.updated_at does not exist")
+        rows = sorted(self._rows.get(table, {}).items(), key=lambda item: item[1])
+        if since is None:
+            return rows[-1:]
+        return [(row_id, ts) for row_id, ts in rows if ts > since][:limit]
+
+    def count(self, table):
+        return len(self._rows.get(table, {}))
+
+
+class ChangePoller:
+    """Publishes bus events for changes found by polling a change source"""
+
+    def __init__(self, bus, source, tables=WATCHED_TABLES, interval=INVALIDATION_POLL_SECONDS):
+        self.bus = bus
+        self.source = source
+        self.tables = list(tables)
+        self.interval = interval
+        self._state = {}  # table -> {"since", "count", "use_updated_at"}
+        self._thread = None
+        self._pid = None
+        self.polls = 0
+        self.errors = 0
+
+    def poll_once(self):
+        for table in self.tables:
+            try:
+                self._poll_table(table)
+                self.bus.set_tracked(table, self._state[table]["use_updated_at"])
+            except Exception as e:
+                self.errors += 1
+                self.bus.set_tracked(table, False)
+                print(f"⚠️ Change poll of {table} failed: {e}")
+        self.polls += 1
+
+    def _poll_table(self, table):
+        state = self._state.get(table)
+        if state is None:
+            # First poll only records where we are
+            state = {"since": None, "count": None, "use_updated_at": True}
+            self._state[table] = state
+            try:
+                latest = self.source.changed_since(table, None)
+                state["since"] = latest[0][1] if latest else None
+            except Exception as e:
+                state["use_updated_at"] = False
+                print(f"ℹ️ {table}: no usable updated_at column ({e}); using row counts only")
+            state["count"] = self.source.count(table)
+            return
+
+        if state["use_updated_at"]:
+            changed = self.source.changed_since(table, state["since"])
+            newer = [(row_id, ts) for row_id, ts in changed if ts and (not state["since"] or ts > state["since"])]
+            if newer:
+                state["since"] = newer[-1][1] if state["since"] else max(ts for _, ts in newer)
+                self.bus.publish(table, ids=[row_id for row_id, _ in newer], op="update", source="poller")
+
+        count = self.source.count(table)
+        if count != state["count"]:
+            # Inserts/deletes (deleted rows leave no updated_at behind)
+            state["count"] = count
+            self.bus.publish(table, ids=None, op="count_changed", source="poller")
+
+    def start(self):
+        """Start the polling thread for this process (again after a fork)"""
+        if self.interval <= 0 or (self._thread and self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        self._pid = os.getpid()
+
+        def _loop():
+            while True:
+                self.poll_once()
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=_loop, name="invalidation-poller", daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        return {
+            "polls": self.polls,
+            "errors": self.errors,
+            "interval": self.interval,
+            "tables": {t: {"since": s["since"], "count": s["count"], "updated_at": s["use_updated_at"]}
+                       for t, s in self._state.items()},
+        }
+
+
+bus = InvalidationBus()
+_poller = None
+
+
+def start_poller(source=None):
+    """Start (or restart after fork) the process's change poller"""
+    global _poller
+    if _poller is None:
+        _poller = ChangePoller(bus, source or SupabaseChangeSource())
+    _poller.start()
+    return _poller
+
+
+def poller_snapshot():
+    return _poller.snapshot() if _poller else None
@@ -0,0 +1,67 @@
+"""Compare search latency of the single-collection and per-program index layouts.
+
+    python layout_bench.py
+
+Both layouts are built from data/*.md into throwaway directories. Every
+question in retrieval_eval.jsonl is run twice per layout: scoped to the
+program of its expected source (where clause vs. own collection) and
+unscoped (one graph vs. fan-out over all program graphs).
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+from create_database import load_and_process_md_files, create_vector_store
+from retrieval_eval import EVAL_FILE, load_labels, evaluate
+from vector_index import LAYOUTS
+
+
+def run(directory="data", labels_path=EVAL_FILE):
+    texts = load_and_process_md_files(directory)
+    labels = load_labels(labels_path)
+    programs = {l["question"]: os.path.splitext(l["expected_source"])[0].lower() for l in labels}
+
+    results = []
+    for layout in LAYOUTS:
+        persist_directory = tempfile.mkdtemp(prefix=f"bench_{layout}_")
+        try:
+            index = create_vector_store(texts, persist_directory, layout=layout)
+            count = index.count()
+            scoped = evaluate(
+                lambda question, k: [doc for doc, _ in index.search(question, k, {"program": programs[question]})],
+                labels, persist_directory, count
+            )
+            unscoped = evaluate(index.similarity_search, labels, persist_directory, count)
+        finally:
+            shutil.rmtree(persist_directory, ignore_errors=True)
+        for scope, report in (("scoped", scoped), ("unscoped", unscoped)):
+            results.append({
+                "layout": layout,
+                "scope": scope,
+                "mean_latency_ms": report["mean_latency_ms"],
+                "p95_latency_ms": report["p95_latency_ms"],
+                "recall@3": report["recall@3"],
+                "mrr": report["mrr"],
+            })
+
+    columns = ["layout", "scope", "mean_latency_ms", "p95_latency_ms", "recall@3", "mrr"]
+    print("\n" + "".join(f"{c:>16}" for c in columns))
+    for r in results:
+        print("".join(f"{str(r[c]):>16}" for c in columns))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single vs per-program Chroma layouts")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--labels", default=EVAL_FILE)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data):
+        parser.error(f"data directory '{args.data}' not found")
+    results = run(args.data, args.labels)
+    if args.json:
+        print(json.dumps(results, indent=2))
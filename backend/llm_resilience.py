@@ -0,0 +1,126 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# ---------------- Resilience config ----------------
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "20"))               # whole answer: retries and fallback tiers included
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "12"))  # single attempt
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# LLM calls run here so a hung upstream never holds a Flask worker past its deadline.
+# future.cancel() can't stop a call that is already running: a timed-out call keeps
+# its thread until the HTTP client's own timeout (GROQ_TIMEOUT) ends it. Each request
+# can leave up to LLM_RETRIES + 1 such calls behind per tier, so size this for that.
+_llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+    thread_name_prefix="llm-call"
+)
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not answer within the deadline, or its circuit is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after the reset timeout"""
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                print(f"🔌 Circuit '{self.name}' opened after {self._failures} failure(s)")
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+
+class ResilientChain:
+    """Wrap a LangChain runnable with a deadline, bounded retries and a circuit breaker"""
+
+    def __init__(self, chain, name, deadline=LLM_DEADLINE, attempt_timeout=LLM_ATTEMPT_TIMEOUT,
+                 retries=LLM_RETRIES, backoff=LLM_BACKOFF, breaker=None):
+        self.chain = chain
+        self.name = name
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def invoke(self, inputs, give_up_at=None):
+        """Call the chain; give_up_at (time.monotonic()) is a deadline shared with other tiers"""
+        give_up_at = min(give_up_at or float("inf"), time.monotonic() + self.deadline)
+        if give_up_at <= time.monotonic():
+            # An earlier tier spent the budget; not this upstream's failure
+            raise LLMUnavailable(f"no time left for LLM '{self.name}'")
+        if not self.breaker.allow():
+            raise LLMUnavailable(f"circuit '{self.name}' is open")
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            future = _llm_executor.submit(self.chain.invoke, inputs)
+            try:
+                result = future.result(timeout=min(self.attempt_timeout, remaining))
+                self.breaker.record_success()
+                return result
+            except FutureTimeout:
+                future.cancel()  # only helps if the call hasn't started
+                last_error = TimeoutError(f"attempt {attempt + 1} timed out")
+            except Exception as e:
+                last_error = e
+            print(f"⚠️ LLM '{self.name}' attempt {attempt + 1} failed: {last_error}")
+
+            # Exponential backoff with jitter, never past the deadline
+            sleep_for = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            if attempt < self.retries and time.monotonic() + sleep_for < give_up_at:
+                time.sleep(sleep_for)
+
+        self.breaker.record_failure()
+        raise LLMUnavailable(f"LLM '{self.name}' failed: {last_error}")
@@ -0,0 +1,195 @@
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+RULE_RE = re.compile(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$")
+SEMESTER_RE = re.compile(r"semester\s*(\d)\b|\b(\d)(?:st|nd|rd|th)?\s+semester", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(first|second|third|fourth|forth)\s+year\b", re.IGNORECASE)
+YEAR_NUMBERS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "forth": 4}
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def section_labels(title):
+    """Semester/year named by a heading, e.g. 'Semester 3 Course Outline' -> {'semester': 3}"""
+    labels = {}
+    m = SEMESTER_RE.search(title)
+    if m:
+        labels["semester"] = int(m.group(1) or m.group(2))
+    m = YEAR_RE.search(title)
+    if m:
+        labels["year"] = YEAR_NUMBERS[m.group(1).lower()]
+    return labels
+
+
+def _clean_title(title):
+    return title.replace("\\-", "-").strip()
+
+
+def _split_line(line, limit):
+    """Cut one over-long line into pieces of at most limit characters without dropping text.
+
+    Prefers the last sentence end in the window, then the last space; a single
+    word longer than limit is cut where it stands.
+    """
+    pieces = []
+    rest = line
+    while len(rest) > limit:
+        window = rest[:limit + 1]
+        cut = max((m.start() for m in SENTENCE_END_RE.finditer(window) if m.start() >= limit // 2), default=0)
+        if not cut:
+            cut = window.rstrip().rfind(" ")
+        if cut <= 0:
+            cut = limit
+        pieces.append(rest[:cut].rstrip())
+        rest = rest[cut:].lstrip()
+    if rest:
+        pieces.append(rest)
+    return pieces
+
+
+def missing_words(text, chunks):
+    """Words of text that no chunk carries (counted with multiplicity); empty when nothing was lost.
+
+    Horizontal rules are left out on both sides: the splitter drops them on purpose.
+    """
+    def _words(content):
+        return (word for line in content.split("\n") if not RULE_RE.match(line) for word in line.split())
+
+    have = Counter(word for chunk, _ in chunks for word in _words(chunk))
+    return Counter(_words(text)) - have
+
+
+class MarkdownSectionSplitter:
+    """Split markdown into heading-aligned chunks in a single pass.
+
+    Chunks start at headings, tables are never cut mid-row (an oversized table
+    is split by rows with its header repeated), tiny sections are merged with
+    the next one unless that would mix two semesters/years, and every chunk
+    carries its heading path as metadata.
+    """
+
+    def __init__(self, chunk_size=1500, min_chunk_size=None):
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size if min_chunk_size is not None else chunk_size // 4
+
+    # ---------- parsing ----------
+    def _blocks(self, text):
+        """Yield (kind, text, level, title) for headings, tables and text blocks"""
+        kind, lines = None, []
+
+        def flush():
+            if lines:
+                yield kind, "\n".join(lines), 0, None
+
+        for line in text.splitlines():
+            heading = HEADING_RE.match(line)
+            if heading:
+                yield from flush()
+                kind, lines = None, []
+                yield "heading", line.strip(), len(heading.group(1)), _clean_title(heading.group(2))
+            elif not line.strip() or RULE_RE.match(line):
+                yield from flush()
+                kind, lines = None, []
+            else:
+                line_kind = "table" if line.lstrip().startswith("|") else "text"
+                if kind != line_kind:
+                    yield from flush()
+                    kind, lines = line_kind, []
+                lines.append(line.rstrip())
+        yield from flush()
+
+    def _pieces(self, kind, text, budget):
+        """Cut an oversized block into pieces of at most budget characters"""
+        lines = text.split("\n")
+        header = lines[:2] if kind == "table" and len(lines) > 2 else []
+        body = lines[len(header):]
+        # Room for one line after the repeated table header
+        limit = max(50, budget - len("\n".join(header)) - 1)
+        pieces, current = [], list(header)
+        for line in (segment for line in body for segment in _split_line(line, limit)):
+            if len("\n".join(current + [line])) > budget and len(current) > len(header):
+                pieces.append("\n".join(current))
+                current = list(header)
+            current.append(line)
+        if len(current) > len(header):
+            pieces.append("\n".join(current))
+        return pieces
+
+    # ---------- chunking ----------
+    def split_text(self, text):
+        """Return [(chunk_text, metadata)]"""
+        chunks = []
+        path = []           # [(level, title, heading_line)]
+        parts, size = [], 0
+        meta = None         # set when the chunk receives its first content block
+        has_content = False
+
+        def flush():
+            nonlocal parts, size, meta, has_content
+            if parts:
+                chunk_meta = meta or self._path_metadata(path)
+                chunks.append(("\n\n".join(parts), chunk_meta))
+            parts, size, meta, has_content = [], 0, None, False
+
+        def add(block):
+            nonlocal size
+            parts.append(block)
+            size += len(block) + 2
+
+        for kind, block, level, title in self._blocks(text):
+            if kind == "heading":
+                labels = section_labels(title)
+                mixes_sections = bool(labels and meta and any(
+                    key in meta and meta[key] != value for key, value in labels.items()
+                ))
+                if has_content and (size >= self.min_chunk_size or mixes_sections):
+                    flush()
+                while path and path[-1][0] >= level:
+                    path.pop()
+                path.append((level, title, block))
+                add(block)
+                continue
+
+            if has_content and size + len(block) > self.chunk_size:
+                flush()
+                # Continuation chunk: repeat the heading path for context
+                for _, _, heading_line in path:
+                    add(heading_line)
+
+            if meta is None:
+                meta = self._path_metadata(path)
+            budget = max(200, self.chunk_size - size)
+            if len(block) <= budget:
+                add(block)
+                has_content = True
+                continue
+
+            for piece in self._pieces(kind, block, budget):
+                if has_content and size + len(piece) > self.chunk_size:
+                    flush()
+                    meta = self._path_metadata(path)
+                    for _, _, heading_line in path:
+                        add(heading_line)
+                add(piece)
+                has_content = True
+
+        flush()
+        return chunks
+
+    def _path_metadata(self, path):
+        meta = {}
+        if path:
+            meta["heading_path"] = " > ".join(title for _, title, _ in path)
+            meta["section"] = path[-1][1]
+        for _, title, _ in path:
+            meta.update(section_labels(title))
+        return meta
+
+    def split_documents(self, documents):
+        out = []
+        for doc in documents:
+            for text, meta in self.split_text(doc.page_content):
+                out.append(Document(page_content=text, metadata={**doc.metadata, **meta}))
+        return out
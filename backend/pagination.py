@@ -0,0 +1,30 @@
+import json
+import base64
+
+
+def postgrest_quote(value):
+    """Quote a value for use inside a PostgREST or=(...) filter"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def keyset_filter(column, value, last_id, descending=False):
+    """PostgREST or-filter body selecting rows after (value, last_id) in (column, id) order"""
+    op = "lt" if descending else "gt"
+    value = postgrest_quote(value)
+    return f"{column}.{op}.{value},and({column}.eq.{value},id.{op}.{last_id})"
+
+
+def encode_cursor(value, last_id):
+    """Opaque cursor for the row a page ended on"""
+    raw = json.dumps([value, last_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(value, last_id) from encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(raw)
+        return value, last_id
+    except Exception:
+        raise ValueError("Invalid cursor")
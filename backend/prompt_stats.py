@@ -0,0 +1,61 @@
+"""Prompt configuration and per-version call/token accounting.
+
+Kept apart from prompts.py so server.py can report the numbers on /health
+without importing langchain.
+"""
+import os
+import threading
+
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v2")
+PROMPT_AB = os.getenv("PROMPT_AB", "")
+
+
+def _parse_ab(spec):
+    """'v1:50,v2:50' -> [(version, weight)]; prompts.py checks the versions exist"""
+    buckets = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        version, _, weight = part.partition(":")
+        buckets.append((version, float(weight or 1)))
+    return buckets
+
+
+AB_BUCKETS = _parse_ab(PROMPT_AB)
+
+
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_version = {}
+
+    def record(self, version, tier, seconds, usage):
+        with self._lock:
+            stats = self._by_version.setdefault(version, {
+                "calls": 0, "seconds": 0.0, "measured_calls": 0,
+                "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "by_tier": {},
+            })
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["by_tier"][tier] = stats["by_tier"].get(tier, 0) + 1
+            if usage:
+                stats["measured_calls"] += 1
+                stats["prompt_tokens"] += usage[0]
+                stats["cached_tokens"] += usage[1]
+                stats["completion_tokens"] += usage[2]
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for version, s in self._by_version.items():
+                measured = s["measured_calls"] or 1
+                out[version] = {
+                    **s,
+                    "by_tier": dict(s["by_tier"]),
+                    "seconds": round(s["seconds"], 3),
+                    "avg_seconds": round(s["seconds"] / s["calls"], 3),
+                    "avg_prompt_tokens": round(s["prompt_tokens"] / measured, 1),
+                    "cached_ratio": round(s["cached_tokens"] / s["prompt_tokens"], 3) if s["prompt_tokens"] else 0.0,
+                }
+            return {"default": PROMPT_VERSION, "ab": dict(AB_BUCKETS), "versions": out}
+
+
+prompt_stats = PromptStats()
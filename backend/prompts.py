@@ -0,0 +1,89 @@
+"""Versioned answer prompts, A/B assignment and per-version token accounting.
+
+v1 is the original single-message template: instructions after the
+retrieved context, so no two calls share a prefix. v2 puts a compact, fixed
+system message first and only the context and question after it, so
+providers that cache prompt prefixes (Groq does on models that support it)
+can reuse the instruction tokens between calls.
+
+PROMPT_VERSION picks the version. PROMPT_AB="v1:50,v2:50" splits traffic
+instead; a question always gets the same version, so repeats are
+comparable. The /health "prompts" block reports calls, latency and
+prompt / cached / completion tokens per version (see prompt_stats.py).
+"""
+import zlib
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from prompt_stats import PROMPT_VERSION, AB_BUCKETS as _AB_BUCKETS
+
+_V1_TEMPLATE = """You are a friendly assistant at Samriddhi College. Answer questions naturally and conversationally.
+
+Context from documents:
+{context}
+
+Question: {question}
+
+Instructions:
+- Answer in a natural, conversational tone (like talking to a friend)
+- Be helpful and informative
+- Keep it concise but complete
+- If info is partial, share what you know
+- Don't use bullet points unless listing multiple items
+- Don't be overly formal or robotic
+
+Answer:"""
+
+# Nothing request-specific may go in here, or the cached prefix breaks
+_V2_SYSTEM = (
+    "You are Samriddhi College's assistant. Answer from the given context in a friendly, "
+    "conversational tone: concise but complete, not formal. If the context only partly covers "
+    "the question, share what it does say. Use bullet points only for lists."
+)
+
+_V2_USER = """Context:
+{context}
+
+Question: {question}"""
+
+PROMPTS = {
+    "v1": ChatPromptTemplate.from_template(_V1_TEMPLATE),
+    "v2": ChatPromptTemplate.from_messages([("system", _V2_SYSTEM), ("human", _V2_USER)]),
+}
+
+
+for _version, _ in _AB_BUCKETS:
+    if _version not in PROMPTS:
+        raise ValueError(f"Unknown prompt version '{_version}' in PROMPT_AB")
+if PROMPT_VERSION not in PROMPTS:
+    raise ValueError(f"Unknown PROMPT_VERSION '{PROMPT_VERSION}', expected one of {sorted(PROMPTS)}")
+
+
+def choose_version(key):
+    """Prompt version for a request; key (e.g. the normalized question) keeps assignment sticky"""
+    if not _AB_BUCKETS:
+        return PROMPT_VERSION
+    total = sum(weight for _, weight in _AB_BUCKETS)
+    point = (zlib.crc32(str(key).encode("utf-8")) % 10000) / 10000 * total
+    for version, weight in _AB_BUCKETS:
+        if point < weight:
+            return version
+        point -= weight
+    return _AB_BUCKETS[-1][0]
+
+
+def build_messages(version, question, context):
+    return PROMPTS[version].format_messages(question=question, context=context)
+
+
+def usage_of(message):
+    """(prompt_tokens, cached_tokens, completion_tokens) reported with a chat model reply; None if absent"""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        return usage.get("input_tokens", 0), cached or 0, usage.get("output_tokens", 0)
+    raw = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    if raw:
+        cached = (raw.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        return raw.get("prompt_tokens", 0), cached or 0, raw.get("completion_tokens", 0)
+    return None
@@ -3,15 +3,28 @@ from dotenv import load_dotenv
 import requests
 from urllib.parse import quote_plus
 import re
+import json
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-import torch
+import httpx
+
 from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from supabase import create_client, Client
+from embedding_backends import create_embeddings
+from singleflight import SingleFlight
+from chunk_metadata import query_filters
+from vector_index import VectorIndex
+from md_splitter import section_labels
+from caches import student_counts, student_list_cursors, conversation_states
+from conversation import resolve_follow_up, remember_turn
+from pagination import keyset_filter
+from llm_resilience import ResilientChain, LLMUnavailable, LLM_DEADLINE
+from prompts import choose_version, build_messages, usage_of
+from prompt_stats import prompt_stats
 
 load_dotenv()
 
@@ -19,6 +32,81 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
 
+# ---------------- LLM config ----------------
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_TEMPERATURE = float(os.getenv("GROQ_TEMPERATURE", "0.4"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "0"))  # retries live in llm_resilience
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_API_BASE = os.getenv("GROQ_API_BASE")  # e.g. a local fake endpoint for benchmarks
+
+# ---------------- Model routing ----------------
+# Short questions with a confident top hit go to the small model with only the
+# best few chunks; everything else goes to GROQ_MODEL with the full context.
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+GROQ_FAST_MODEL = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+ROUTER_MAX_QUESTION_WORDS = int(os.getenv("ROUTER_MAX_QUESTION_WORDS", "15"))
+ROUTER_MIN_TOP_SCORE = float(os.getenv("ROUTER_MIN_TOP_SCORE", "0.6"))
+ROUTER_FAST_CHUNKS = int(os.getenv("ROUTER_FAST_CHUNKS", "3"))
+ROUTER_MAX_FAST_CONTEXT_CHARS = int(os.getenv("ROUTER_MAX_FAST_CONTEXT_CHARS", "4000"))
+
+# One keep-alive connection pool for every Groq client in the process
+_groq_http_client = None
+_llm_clients = {}
+_llm_lock = threading.Lock()
+
+def get_llm(model_name=GROQ_MODEL, temperature=GROQ_TEMPERATURE):
+    """Return a process-wide ChatGroq client for this model/temperature"""
+    global _groq_http_client
+    key = (model_name, temperature)
+    with _llm_lock:
+        if key not in _llm_clients:
+            if _groq_http_client is None:
+                _groq_http_client = httpx.Client(
+                    timeout=httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=GROQ_MAX_CONNECTIONS,
+                        max_keepalive_connections=GROQ_MAX_CONNECTIONS
+                    )
+                )
+            _llm_clients[key] = ChatGroq(
+                temperature=temperature,
+                model_name=model_name,
+                groq_api_key=os.getenv("GROQ_API_KEY"),
+                groq_api_base=GROQ_API_BASE,
+                request_timeout=GROQ_TIMEOUT,
+                max_retries=GROQ_MAX_RETRIES,
+                http_client=_groq_http_client
+            )
+        return _llm_clients[key]
+
+# ---------------- Speculative retrieval ----------------
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_MAX_CONCURRENCY", "8")),
+    thread_name_prefix="retrieval"
+)
+
+# ---------------- Batch queries ----------------
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+# "how many students by section", "batch-wise count", "per semester" ...
+BREAKDOWN_RE = re.compile(r"\b(?:by|per|each|every)\s+(batch|section|semester)\b|\b(batch|section|semester)[- ]?wise\b")
+
+# ---------------- Student lists ----------------
+STUDENT_LIST_PAGE_SIZE = int(os.getenv("STUDENT_LIST_PAGE_SIZE", "10"))
+# Rows per request when a count breakdown has to read every matching student
+STUDENT_FETCH_PAGE_SIZE = int(os.getenv("STUDENT_FETCH_PAGE_SIZE", "1000"))
+SHOW_MORE_RE = re.compile(
+    r"^\W*(?:ok\s+|please\s+)?(?:show|give|list|see|load)?\s*(?:me\s+)?(?:some\s+)?"
+    r"(?:more|next)(?:\s+(?:students|names|ones|page))?(?:\s+please)?\W*$",
+    re.IGNORECASE
+)
+
+# Identical questions that arrive while one is being answered share its result
+_inflight_responses = SingleFlight()
+
 # ---------------- Helper utils ----------------
 def _safe(val):
     if val is None:
@@ -38,6 +126,17 @@ def _get_pronouns(gender):
     else:
         return {"subject": "they", "object": "them", "possessive": "their", "possessive_adj": "their"}
 
+def _normalize_question(question):
+    q = re.sub(r"[^\w\s]", " ", question.lower())
+    return re.sub(r"\s+", " ", q).strip()
+
+def _request_key(question, user_role, user_data):
+    # Personal answers ("my gpa") depend on who is asking, so the user is part of the key
+    return (_normalize_question(question), user_role, _user_key(user_data))
+
+def _user_key(user_data):
+    return (user_data or {}).get('email') or (user_data or {}).get('id')
+
 def _sample_names(records, n=5):
     names = []
     for r in records:
@@ -49,16 +148,25 @@ def _sample_names(records, n=5):
 # ---------------- Main system ----------------
 class CollegeQuerySystem:
 
-    def __init__(self):
-        self.embedding = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+    def __init__(self, llm=None, fast_llm=None):
+        """llm / fast_llm: any LangChain chat models; default to the shared Groq clients.
+        Tests and benchmarks can pass e.g. FakeListChatModel to stay offline."""
+        # Backend chosen by EMBEDDING_BACKEND; repeated questions hit the on-disk cache
+        self.embedding = create_embeddings()
         self.vectordb_path = "db"
+        # Single collection or one per program, chosen by INDEX_LAYOUT
+        self.index = VectorIndex(self.vectordb_path, self.embedding)
         self.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
         self.storage_bucket = "college-documents"
 
+        # Built once; generate_response only invokes it
+        self.llm = llm or get_llm()
+        self.fast_llm = fast_llm or (llm if llm else get_llm(GROQ_FAST_MODEL))
+        # Messages are built per call from the request's prompt version (prompts.py)
+        self.chain = ResilientChain(self.llm, "large")
+        self.fast_chain = ResilientChain(self.fast_llm, "fast")
+        self.routing_stats = {"fast": 0, "large": 0}
+
         self.programs = {
             "csit": {
                 "name": "Bachelor of Science in Computer Science and IT", 
@@ -211,6 +319,57 @@ class CollegeQuerySystem:
         except Exception as e:
             return []
 
+    def _count_supabase(self, table, params=None):
+        """Row count only (HEAD + Prefer: count=exact): no rows are transferred; None on failure"""
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            return None
+
+        url = f"{SUPABASE_URL}/rest/v1/{table}"
+        headers = {
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Prefer": "count=exact",
+        }
+        query_params = {"select": "id", "limit": 0}
+        if params:
+            query_params.update(params)
+
+        try:
+            resp = requests.head(url, headers=headers, params=query_params, timeout=10)
+            # Content-Range: "*/42"
+            content_range = resp.headers.get("Content-Range", "")
+            if resp.status_code in (200, 206) and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1]
+                return int(total) if total.isdigit() else None
+            return None
+        except Exception as e:
+            return None
+
+    def _query_supabase_page(self, table, params, count=False):
+        """One page of rows plus, with count=True, the total from Content-Range; ([], None) on failure"""
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            return [], None
+
+        url = f"{SUPABASE_URL}/rest/v1/{table}"
+        headers = {
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+        }
+        if count:
+            headers["Prefer"] = "count=exact"
+
+        try:
+            resp = requests.get(url, headers=headers, params=params, timeout=10)
+            if resp.status_code not in (200, 206):
+                return [], None
+            total = None
+            if count:
+                total = resp.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                total = int(total) if total.isdigit() else None
+            return resp.json(), total
+        except Exception as e:
+            return [], None
+
     def _extract_person_name(self, question):
         """Extract person name from various question formats"""
         q_lower = question.lower().strip()
@@ -546,8 +705,16 @@ class CollegeQuerySystem:
         
         return None
 
-    def _handle_person_query(self, question, user_data=None):
+    def _handle_person_query(self, question, user_data=None, turn=None):
         """Handle all types of person-related queries"""
+        turn = turn if turn is not None else {}
+
+        # Follow-up about the person from the previous turn: no new lookup
+        known = turn.get("person")
+        if known:
+            turn["found_person"] = known
+            specific_response = self._handle_specific_field_query(question, known["record"])
+            return specific_response or self._get_person_info(known["record"])
         
         # Check for personal pronouns if user_data is provided
         if user_data:
@@ -597,6 +764,7 @@ class CollegeQuerySystem:
         person_data = self._search_person(name)
         if not person_data:
             return f"Hmm, I couldn't find anyone named {name.title()} in our database. Could you double-check the spelling?"
+        turn["found_person"] = {"name": name, "record": person_data}
         
         # Check if performance query
         q_lower = question.lower()
@@ -714,23 +882,223 @@ class CollegeQuerySystem:
 
     # ... (rest of the methods remain the same: get_vectordb, detect_program, query_documents, etc.)
     
-    def generate_response(self, question, user_role="guest", user_data=None):
-        """Main response generation with improved flow"""
-        q_lower = question.lower().strip()
+    def generate_response(self, question, user_role="guest", user_data=None, session_id=None, with_route=False):
+        """Answer a question, coalescing identical concurrent requests.
+
+        With a session_id, follow-ups are resolved against the session's previous
+        turn (see conversation.py) and this turn is remembered for the next one.
+        with_route=True returns (response, route): the handler that answered
+        ("person", "student_count", ...), "document" or "access_denied".
+        """
+        state = conversation_states.get(session_id) if session_id else None
+        turn = resolve_follow_up(question, state, self.programs)
+        if turn:
+            print(f"↪️ Follow-up resolved to: '{turn['question']}'")
+        else:
+            turn = {"question": question, "docs": None, "person": None, "documents_only": False}
+
+        key = _request_key(turn["question"], user_role, user_data)
+        response, context, route = _inflight_responses.do(key, self._answer_turn, turn, user_role, user_data)
+        if session_id:
+            if context["program"] is None and state:
+                # context is shared with every caller coalesced onto this request
+                context = {**context, "program": state["program"]}
+            conversation_states.set(session_id, context)
+        return (response, route) if with_route else response
+
+    def _answer_turn(self, turn, user_role, user_data):
+        """(response, state for the next follow-up, route) for a resolved turn"""
+        response = self._generate_response(turn["question"], user_role, user_data, turn=turn)
+        context = remember_turn(turn["question"], turn.get("program"), turn.get("found_person"), turn.get("retrieved"))
+        return response, context, turn.get("route")
+
+    def generate_batch(self, items, max_concurrency=BATCH_LLM_CONCURRENCY):
+        """Answer many questions at once.
+
+        items: [{"question", "user_role"?, "user_data"?}]. Duplicate questions are
+        answered once, all document-path questions are embedded in one model call
+        and searched together, and LLM calls run with bounded concurrency.
+        Returns [{"response", "error"}] aligned with items.
+        """
+        keys = []
+        unique = {}
+        for item in items:
+            key = _request_key(item["question"], item.get("user_role", "guest"), item.get("user_data"))
+            keys.append(key)
+            unique.setdefault(key, item)
+        print(f"📦 Batch: {len(items)} questions, {len(unique)} unique")
+
+        results = {}
+        pending = []
+        for key, item in unique.items():
+            question = item["question"]
+            user_role = item.get("user_role", "guest")
+            user_data = item.get("user_data")
+            try:
+                query_type = self._classify_query_type(question)
+                has_access, error_message = self._check_data_access(question, user_role, user_data)
+                if not has_access:
+                    results[key] = {"response": error_message, "error": None}
+                    continue
+                response = self._answer_with_handler(question, query_type, user_data)
+                if response:
+                    results[key] = {"response": response, "error": None}
+                else:
+                    pending.append(key)
+            except Exception as e:
+                results[key] = {"response": None, "error": str(e)}
+
+        if pending:
+            try:
+                retrieved = self._retrieve_many([unique[key]["question"] for key in pending], k=20)
+            except Exception as e:
+                retrieved = None
+                for key in pending:
+                    results[key] = {"response": None, "error": f"retrieval failed: {e}"}
+
+            if retrieved is not None:
+                with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-llm") as pool:
+                    futures = {
+                        key: pool.submit(self._answer_from_documents, unique[key]["question"], docs)
+                        for key, docs in zip(pending, retrieved)
+                    }
+                    for key, future in futures.items():
+                        try:
+                            results[key] = {"response": future.result(), "error": None}
+                        except Exception as e:
+                            results[key] = {"response": None, "error": str(e)}
+
+        return [dict(results[key]) for key in keys]
+
+    def coalescing_stats(self):
+        return _inflight_responses.snapshot()
+
+    def _generate_response(self, question, user_role="guest", user_data=None, turn=None):
+        """Main response generation with improved flow.
+
+        turn (from generate_response) may carry a person record or chunks to reuse,
+        and collects what this answer resolved: program, person, retrieved chunks.
+        """
         print(f"🧠 Processing: '{question}'")
         print(f"👤 User role: {user_role}")
+        turn = turn if turn is not None else {}
         
         query_type = self._classify_query_type(question)
+        known = turn.get("person")
+        if known and query_type == "document" and self._handle_specific_field_query(question, known["record"]):
+            # "what is Ram's email?" (a resolved "her email?") has no keyword the classifier
+            # knows, but the person from the previous turn answers it
+            query_type = "person"
         print(f"📊 Query type: {query_type}")
 
+        program, program_data = self.detect_program(question)
+        turn["program"] = program
+        retrieval = None
+        if SPECULATIVE_RETRIEVAL and not turn.get("docs"):
+            # Start the vector search now, in parallel with the access check and the
+            # database handlers, so a fall-through doesn't pay both latencies in a row
+            retrieval = _retrieval_executor.submit(self._retrieve, question, program, 20)
+
         # Check access permissions
         has_access, error_message = self._check_data_access(question, user_role, user_data)
         if not has_access:
+            if retrieval:
+                retrieval.cancel()
+            turn["route"] = "access_denied"
             return error_message
 
-        # Route to appropriate handler
+        # Route to appropriate handler ("tell me more" goes straight back to the documents)
+        response = None if turn.get("documents_only") else self._answer_with_handler(question, query_type, user_data, turn)
+        if response:
+            if retrieval:
+                retrieval.cancel()
+            turn["route"] = query_type
+            return response
+        turn["route"] = "document"
+
+        # Fall back to document-based search, reusing the previous turn's chunks when they cover it
+        if turn.get("docs"):
+            print(f"♻️ Reusing {len(turn['docs'])} chunks from the previous turn")
+            scored_docs = turn["docs"]
+        else:
+            scored_docs = retrieval.result() if retrieval else self._retrieve(question, program, k=20)
+        turn["retrieved"] = scored_docs
+        return self._answer_from_documents(question, scored_docs)
+
+    def _answer_from_documents(self, question, scored_docs):
+        """Turn retrieved chunks into an answer: model routing, LLM call, extractive fallback"""
+        context = self._format_context([doc for doc, _ in scored_docs])
+        
+        if not context or len(context.strip()) < 10:
+            return "Hmm, I couldn't find specific information about that. Could you rephrase your question or ask about something else?"
+
+        # Use LLM for natural response generation
+        tier, reason = self._route_model(question, scored_docs)
+        print(f"🧭 Model route: {tier} ({reason})")
+        self.routing_stats[tier] += 1
+
+        attempts = []
+        if tier == "fast":
+            fast_context = self._format_context([doc for doc, _ in scored_docs[:ROUTER_FAST_CHUNKS]])
+            attempts.append((self.fast_chain, fast_context))
+        attempts.append((self.chain, context))
+
+        version = choose_version(_normalize_question(question))
+        # One budget for both tiers, so a hung upstream can't hold the request twice over;
+        # the fast tier may use half of it, leaving the rest for the fallback
+        give_up_at = time.monotonic() + LLM_DEADLINE
+        for i, (chain, chain_context) in enumerate(attempts):
+            tier_give_up_at = give_up_at
+            if i < len(attempts) - 1:
+                tier_give_up_at = time.monotonic() + (give_up_at - time.monotonic()) / 2
+            try:
+                started = time.perf_counter()
+                reply = chain.invoke(build_messages(version, question, chain_context), give_up_at=tier_give_up_at)
+                usage = usage_of(reply)
+                prompt_stats.record(version, chain.name, time.perf_counter() - started, usage)
+                if usage:
+                    print(f"🧾 Prompt {version} ({chain.name}): {usage[0]} prompt tokens, "
+                          f"{usage[1]} cached, {usage[2]} completion")
+                return reply.content.strip()
+            except LLMUnavailable as e:
+                print(f"⚠️ {e}")
+
+        # Upstream is failing: answer from the retrieved text instead of erroring
+        return self._extractive_answer(question, scored_docs)
+
+    def _extractive_answer(self, question, scored_docs, max_sentences=4):
+        """Degraded answer built from the sentences of the top chunks that best match the question"""
+        stop_words = {"what", "who", "is", "the", "of", "in", "a", "an", "for", "and", "are", "how", "me", "tell", "about"}
+        terms = {w for w in re.findall(r"\w+", question.lower()) if w not in stop_words and len(w) > 1}
+
+        candidates = []
+        for rank, (doc, _) in enumerate(scored_docs[:3]):
+            text = self._clean_table_formatting(doc.page_content)
+            for sentence in re.split(r"(?<!Dr\.)(?<!Mr\.)(?<!Ms\.)(?<!Mrs\.)(?<!Prof\.)(?<=[.!?])\s+|\n+", text):
+                sentence = sentence.strip(" #*-\t")
+                if len(sentence) < 15:
+                    continue
+                overlap = len(terms & set(re.findall(r"\w+", sentence.lower())))
+                candidates.append((overlap, -rank, sentence))
+
+        best = [c for c in sorted(candidates, reverse=True) if c[0] > 0][:max_sentences]
+        if not best:
+            return "Sorry, I'm having trouble answering right now. Please try again in a moment."
+
+        lines = "\n".join(f"• {sentence}" for _, _, sentence in best)
+        return f"I'm having trouble reaching my answer engine right now, but here's what I found in our documents:\n\n{lines}"
+
+    def _answer_with_handler(self, question, query_type, user_data=None, turn=None):
+        """Run the database/rule handler for query_type; None means fall back to documents"""
+        q_lower = question.lower().strip()
+
+        if SHOW_MORE_RE.match(question):
+            response = self._continue_student_list(user_data)
+            if response:
+                return response
+
         if query_type == "person":
-            response = self._handle_person_query(question, user_data)
+            response = self._handle_person_query(question, user_data, turn)
             if response:
                 return response
 
@@ -747,74 +1115,39 @@ class CollegeQuerySystem:
                     return response
 
         elif query_type == "student_list":
-            response = self._handle_student_list_query(question)
+            response = self._handle_student_list_query(question, user_data)
             if response:
                 return response
 
         elif query_type == "student_count":
-            # Handle student count queries
-            program_match = None
-            for program, data in self.programs.items():
-                if any(kw in q_lower for kw in data["keywords"]):
-                    program_match = program
-                    break
-            
-            if program_match:
-                params = {"program": f"ilike.%{program_match.upper()}%"}
-                students = self._query_supabase("students_data", params=params)
-                
-                if students:
-                    program_name = self.programs[program_match]["name"]
-                    return f"There are {len(students)} students currently enrolled in {program_name}."
-                else:
-                    return f"I couldn't find any students in that program right now."
-
-        # Fall back to document-based search
-        program, program_data = self.detect_program(question)
-        context = self.query_documents(question, program, k=20)
-        
-        if not context or len(context.strip()) < 10:
-            return "Hmm, I couldn't find specific information about that. Could you rephrase your question or ask about something else?"
-
-        # Use LLM for natural response generation
-        prompt_template = """You are a friendly assistant at Samriddhi College. Answer questions naturally and conversationally.
-
-Context from documents:
-{context}
+            response = self._handle_student_count_query(question)
+            if response:
+                return response
 
-Question: {question}
+        return None
 
-Instructions:
-- Answer in a natural, conversational tone (like talking to a friend)
-- Be helpful and informative
-- Keep it concise but complete
-- If info is partial, share what you know
-- Don't use bullet points unless listing multiple items
-- Don't be overly formal or robotic
+    def _route_model(self, question, scored_docs):
+        """Decide between the fast and the large model; returns (tier, reason)"""
+        if not ROUTER_ENABLED:
+            return "large", "router disabled"
 
-Answer:"""
-        
-        prompt = ChatPromptTemplate.from_template(prompt_template)
+        words = len(question.split())
+        if words > ROUTER_MAX_QUESTION_WORDS:
+            return "large", f"long question ({words} words)"
 
-        chain = prompt | ChatGroq(
-            temperature=0.4,
-            model_name="llama-3.3-70b-versatile",
-            groq_api_key=os.getenv("GROQ_API_KEY")
-        ) | StrOutputParser()
+        top_score = scored_docs[0][1] if scored_docs else 0.0
+        if top_score < ROUTER_MIN_TOP_SCORE:
+            return "large", f"low retrieval confidence ({top_score:.2f})"
 
-        response = chain.invoke({
-            "question": question,
-            "context": context
-        })
+        fast_chars = sum(len(doc.page_content) for doc, _ in scored_docs[:ROUTER_FAST_CHUNKS])
+        if fast_chars > ROUTER_MAX_FAST_CONTEXT_CHARS:
+            return "large", f"long context ({fast_chars} chars)"
 
-        return response.strip()
+        return "fast", f"{words} words, top score {top_score:.2f}"
 
 
-    def get_vectordb(self):
-        return Chroma(
-            persist_directory=self.vectordb_path,
-            embedding_function=self.embedding
-        )
+    def get_vectordb(self, program=None):
+        return self.index.store(program)
 
     def detect_program(self, question):
         """Identify which program the question is about"""
@@ -836,29 +1169,62 @@ Answer:"""
             lines.append(line)
         return '\n'.join(lines)
 
-    def query_documents(self, question, program=None, k=15):
-        """Enhanced document querying with multiple search strategies"""
-        vectordb = self.get_vectordb()
+    def _retrieve(self, question, program=None, k=15):
+        """Return [(doc, relevance)] best first, metadata-prefiltered when possible.
+
+        Filters go from strictest (program + semester/year/course/role) to none;
+        the first one with hits wins. With the per_program layout a program filter
+        routes the search to that program's collection.
+        """
+        vector = self.embedding.embed_query(question)
 
-        if program:
+        for where in query_filters(question, program)[:-1]:
             try:
-                docs = vectordb.similarity_search(
-                    question,
-                    k=k,
-                    filter={"program": program}
-                )
+                docs = self.index.search_by_vectors([vector], k, where)[0]
                 if docs:
-                    raw_context = "\n\n".join([doc.page_content for doc in docs])
-                    return self._clean_table_formatting(raw_context)
+                    return docs
             except:
                 pass
 
-        docs = vectordb.similarity_search(question, k=k)
-        if docs:
-            raw_context = "\n\n".join([doc.page_content for doc in docs])
-            return self._clean_table_formatting(raw_context)
+        return self.index.search_by_vectors([vector], k)[0]
+
+    def _retrieve_many(self, questions, k=15):
+        """Batched _retrieve: one embedding call, one Chroma query per distinct filter"""
+        vectors = self.embedding.embed_documents(questions)
+        results = [[] for _ in questions]
+        cascades = [query_filters(q, self.detect_program(q)[0]) for q in questions]
+
+        # Walk the filter cascades level by level, batching questions that share a filter
+        level = 0
+        pending = list(range(len(questions)))
+        while pending:
+            groups = {}
+            for i in pending:
+                where = cascades[i][min(level, len(cascades[i]) - 1)]
+                groups.setdefault(json.dumps(where, sort_keys=True), (where, []))[1].append(i)
+            for where, indexes in groups.values():
+                try:
+                    hits = self.index.search_by_vectors([vectors[i] for i in indexes], k, where)
+                except Exception:
+                    if where is None:
+                        raise
+                    continue
+                for i, docs in zip(indexes, hits):
+                    results[i] = docs
+            # Questions already at the unfiltered level are done even without hits
+            pending = [i for i in pending if not results[i] and level + 1 < len(cascades[i])]
+            level += 1
+        return results
+
+    def _format_context(self, docs):
+        if not docs:
+            return ""
+        raw_context = "\n\n".join([doc.page_content for doc in docs])
+        return self._clean_table_formatting(raw_context)
 
-        return ""
+    def query_documents(self, question, program=None, k=15):
+        """Enhanced document querying with multiple search strategies"""
+        return self._format_context([doc for doc, _ in self._retrieve(question, program, k)])
 
     def _extract_courses_directly(self, context, semester):
         """Directly extract courses from table data"""
@@ -950,8 +1316,97 @@ Answer:"""
             
         return None
 
-    def _handle_student_list_query(self, question):
-        """Handle student list queries"""
+    def _student_counts(self, program, batch=None, section=None, semester=None, breakdown=False):
+        """Total (and optional batch/section/semester breakdown) for a student filter, cached"""
+        key = (program, batch, section, semester, breakdown)
+        cached = student_counts.get(key)
+        if cached is not None:
+            return cached
+
+        params = {"program": f"ilike.%{program.upper()}%"}
+        if batch:
+            params["batch"] = f"ilike.%{batch}%"
+        if section:
+            params["section"] = f"ilike.{section}"
+
+        if not breakdown and semester is None:
+            total = self._count_supabase("students_data", params)
+            result = {"total": total} if total is not None else None
+        else:
+            # Breakdowns need the grouping columns, but nothing that identifies a student
+            rows = self._fetch_all_rows("students_data", {**params, "select": "id,batch,section,year_semester"})
+            if rows is None:
+                return None
+            if semester is not None:
+                rows = [r for r in rows if section_labels(r.get("year_semester") or "").get("semester") == semester]
+            result = {"total": len(rows)}
+            for label, column in (("batch", "batch"), ("section", "section"), ("semester", "year_semester")):
+                groups = Counter((r.get(column) or "unknown").strip() for r in rows)
+                result[f"by_{label}"] = dict(sorted(groups.items()))
+
+        if result is not None:
+            student_counts.set(key, result)
+        return result
+
+    def _fetch_all_rows(self, table, params, page_size=STUDENT_FETCH_PAGE_SIZE):
+        """Every matching row, paged on id (PostgREST caps one response at max-rows); None if a page fails"""
+        rows, total, last_id = [], None, None
+        while True:
+            page_params = {**params, "order": "id.asc", "limit": page_size}
+            if last_id is not None:
+                page_params["id"] = f"gt.{last_id}"
+            page, count = self._query_supabase_page(table, page_params, count=last_id is None)
+            if last_id is None:
+                total = count
+            rows.extend(page)
+            if not page or (total is not None and len(rows) >= total):
+                break
+            last_id = page[-1]["id"]
+        if total is not None and len(rows) < total:
+            print(f"⚠️ {table}: fetched {len(rows)} of {total} rows")
+            return None
+        return rows
+
+    def _handle_student_count_query(self, question):
+        """Answer 'how many students' with count-only queries"""
+        q_lower = question.lower()
+
+        program_match = None
+        for program, data in self.programs.items():
+            if any(kw in q_lower for kw in data["keywords"]):
+                program_match = program
+                break
+        if not program_match:
+            return None
+
+        batch_match = re.search(r'\b(20\d{2}[-]?[A-Z0-9]*)\b', q_lower)
+        batch = batch_match.group(0) if batch_match else None
+        section = self._extract_section_from_query(question)
+        semester = section_labels(question).get("semester")
+        breakdown_by = [m.group(1) or m.group(2) for m in BREAKDOWN_RE.finditer(q_lower)]
+
+        counts = self._student_counts(program_match, batch, section, semester, breakdown=bool(breakdown_by))
+        if not counts or not counts["total"]:
+            return "I couldn't find any students in that program right now."
+
+        filters = []
+        if batch:
+            filters.append(f"batch {batch}")
+        if section:
+            filters.append(f"section {section}")
+        if semester:
+            filters.append(f"semester {semester}")
+        filter_text = f" ({', '.join(filters)})" if filters else ""
+
+        program_name = self.programs[program_match]["name"]
+        response = f"There are {counts['total']} students currently enrolled in {program_name}{filter_text}."
+        for label in dict.fromkeys(breakdown_by):
+            groups = counts.get(f"by_{label}", {})
+            response += f"\n\nBy {label}:\n" + "\n".join(f"• {value}: {n}" for value, n in groups.items())
+        return response
+
+    def _handle_student_list_query(self, question, user_data=None):
+        """Handle student list queries: filtered, name-only, one page at a time"""
         if not self._is_student_list_query(question):
             return None
             
@@ -968,37 +1423,79 @@ Answer:"""
         
         section = self._extract_section_from_query(question)
         
-        if program_match:
-            params = {"program": f"ilike.%{program_match.upper()}%"}
-            if batch:
-                params["batch"] = f"ilike.%{batch}%"
-                
-            students = self._query_supabase("students_data", params=params)
-            
-            if section and students:
-                students = [s for s in students if s.get('section', '').upper() == section]
+        if not program_match:
+            return None
 
-            if students:
-                program_name = self.programs[program_match]["name"]
-                sample_names = _sample_names(students, 10)
-                
-                filters = []
-                if batch:
-                    filters.append(f"batch {batch}")
-                if section:
-                    filters.append(f"section {section}")
-                
-                filter_text = f" ({', '.join(filters)})" if filters else ""
-                
-                response = f"Found {len(students)} students in {program_name}{filter_text}:\n\n"
-                response += "\n".join([f"• {name}" for name in sample_names])
-                
-                if len(students) > 10:
-                    response += f"\n\n...and {len(students) - 10} more"
-                
-                return response
-        
-        return None
+        cursor = {"program": program_match, "batch": batch, "section": section,
+                  "after": None, "shown": 0, "total": None}
+        return self._student_list_page(cursor, _user_key(user_data))
+
+    def _continue_student_list(self, user_data):
+        """Next page of the user's last student list ("show more"); None if there is none"""
+        user_key = _user_key(user_data)
+        cursor = student_list_cursors.get(user_key) if user_key else None
+        if not cursor:
+            return None
+        return self._student_list_page(cursor, user_key)
+
+    def _student_list_page(self, cursor, user_key=None):
+        """Fetch the page after cursor["after"] (keyset on name, id) and remember where it stopped"""
+        params = {
+            "program": f"ilike.%{cursor['program'].upper()}%",
+            "select": "id,name",
+            "order": "name.asc,id.asc",
+            "limit": STUDENT_LIST_PAGE_SIZE,
+        }
+        if cursor["batch"]:
+            params["batch"] = f"ilike.%{cursor['batch']}%"
+        if cursor["section"]:
+            params["section"] = f"ilike.{cursor['section']}"
+        if cursor["after"]:
+            # Keyset pagination: cost stays flat however deep the user pages
+            params["or"] = f"({keyset_filter('name', *cursor['after'])})"
+
+        # The total is counted with the first page, and again after a students_data change reset it
+        students, total = self._query_supabase_page("students_data", params, count=cursor["total"] is None)
+        if total is not None and cursor["after"]:
+            total += cursor["shown"]  # counted past the cursor only
+        total = cursor["total"] if total is None else total
+
+        program_name = self.programs[cursor["program"]]["name"]
+        filters = []
+        if cursor["batch"]:
+            filters.append(f"batch {cursor['batch']}")
+        if cursor["section"]:
+            filters.append(f"section {cursor['section']}")
+        filter_text = f" ({', '.join(filters)})" if filters else ""
+
+        if not students:
+            if user_key:
+                student_list_cursors.pop(user_key)
+            if cursor["shown"]:
+                return f"That's everyone: all {cursor['shown']} students in {program_name}{filter_text} have been listed."
+            return None
+
+        first = cursor["shown"] + 1
+        shown = cursor["shown"] + len(students)
+        total = total if total is not None else shown
+        if first == 1:
+            response = f"Found {total} students in {program_name}{filter_text}:\n\n"
+        else:
+            response = f"Students {first}-{shown} of {total} in {program_name}{filter_text}:\n\n"
+        response += "\n".join([f"• {name}" for name in _sample_names(students, len(students))])
+
+        remaining = total - shown
+        if remaining > 0:
+            response += f"\n\n...and {remaining} more"
+            if user_key:
+                last = students[-1]
+                student_list_cursors.set(user_key, {**cursor, "after": (last.get("name") or "", last.get("id")),
+                                                    "shown": shown, "total": total})
+                response += f'. Say "show more" to see the next {min(STUDENT_LIST_PAGE_SIZE, remaining)}.'
+        elif user_key:
+            student_list_cursors.pop(user_key)
+
+        return response
 
 
 def interactive_chat():
@@ -0,0 +1,155 @@
+"""Retrieval quality and latency regression harness for the Chroma index.
+
+    python retrieval_eval.py                   # evaluate and compare with the baseline
+    python retrieval_eval.py --save-baseline   # accept the current numbers as the baseline
+
+Each line of retrieval_eval.jsonl labels a question with the source file
+(and optionally a snippet of the chunk) that should be retrieved for it.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+EVAL_FILE = "retrieval_eval.jsonl"
+BASELINE_FILE = "retrieval_baseline.json"
+K_VALUES = (1, 3, 5, 10)
+
+# Allowed drop before a rebuild counts as a regression
+MAX_RECALL_DROP = 0.02
+MAX_MRR_DROP = 0.02
+MAX_LATENCY_RATIO = 1.5
+
+
+def load_labels(path=EVAL_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _is_relevant(doc, label):
+    if doc.metadata.get("source", "").lower() != label["expected_source"].lower():
+        return False
+    expected_text = label.get("expected_text")
+    return not expected_text or expected_text.lower() in doc.page_content.lower()
+
+
+def _index_size(persist_directory):
+    total = 0
+    for root, _, files in os.walk(persist_directory):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def evaluate(search, labels, persist_directory="db", chunk_count=None):
+    """Run every labelled question through search(question, k) -> [Document]"""
+    max_k = max(K_VALUES)
+    hits = {k: 0 for k in K_VALUES}
+    reciprocal_ranks = []
+    latencies = []
+    misses = []
+
+    search(labels[0]["question"], max_k)  # warm-up, not timed
+    for label in labels:
+        start = time.perf_counter()
+        docs = search(label["question"], max_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rank = next((i + 1 for i, doc in enumerate(docs) if _is_relevant(doc, label)), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        for k in K_VALUES:
+            if rank and rank <= k:
+                hits[k] += 1
+        if not rank or rank > 3:
+            misses.append({"question": label["question"], "rank": rank})
+
+    latencies.sort()
+    n = len(labels)
+    return {
+        "questions": n,
+        **{f"recall@{k}": round(hits[k] / n, 4) for k in K_VALUES},
+        "mrr": round(sum(reciprocal_ranks) / n, 4),
+        "mean_latency_ms": round(sum(latencies) / n, 2),
+        "p95_latency_ms": round(latencies[min(n - 1, int(n * 0.95))], 2),
+        "index_bytes": _index_size(persist_directory),
+        "chunks": chunk_count,
+        "misses": misses,
+    }
+
+
+def compare(report, baseline):
+    """Return a list of regressions of report against baseline"""
+    problems = []
+    for k in K_VALUES:
+        key = f"recall@{k}"
+        if key in baseline and report[key] < baseline[key] - MAX_RECALL_DROP:
+            problems.append(f"{key} dropped {baseline[key]:.3f} -> {report[key]:.3f}")
+    if "mrr" in baseline and report["mrr"] < baseline["mrr"] - MAX_MRR_DROP:
+        problems.append(f"MRR dropped {baseline['mrr']:.3f} -> {report['mrr']:.3f}")
+    if baseline.get("mean_latency_ms") and report["mean_latency_ms"] > baseline["mean_latency_ms"] * MAX_LATENCY_RATIO:
+        problems.append(f"mean latency rose {baseline['mean_latency_ms']}ms -> {report['mean_latency_ms']}ms")
+    return problems
+
+
+def print_report(report):
+    print("\n📏 Retrieval evaluation")
+    print(f"   Questions: {report['questions']}, chunks: {report['chunks']}, index: {report['index_bytes'] / 1024:.0f}KB")
+    print("   " + "  ".join(f"recall@{k}={report[f'recall@{k}']:.3f}" for k in K_VALUES) + f"  MRR={report['mrr']:.3f}")
+    print(f"   Latency: mean {report['mean_latency_ms']}ms, p95 {report['p95_latency_ms']}ms")
+    for miss in report["misses"]:
+        print(f"   ⚠️ '{miss['question']}' → rank {miss['rank'] or 'not in top 10'}")
+
+
+def check_against_baseline(report, baseline_path=BASELINE_FILE):
+    """Print regressions against the saved baseline; True if none"""
+    if not os.path.exists(baseline_path):
+        print(f"ℹ️ No baseline at {baseline_path}; run with --save-baseline to create one")
+        return True
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    problems = compare(report, baseline)
+    for p in problems:
+        print(f"❌ Regression: {p}")
+    if not problems:
+        print("✅ No regression against baseline")
+    return not problems
+
+
+def evaluate_vectordb(vectordb, persist_directory="db", labels_path=EVAL_FILE):
+    """Evaluate a VectorIndex with plain (unfiltered) similarity search"""
+    labels = load_labels(labels_path)
+    return evaluate(
+        lambda question, k: vectordb.similarity_search(question, k=k),
+        labels,
+        persist_directory=persist_directory,
+        chunk_count=vectordb.count()
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality of the Chroma index")
+    parser.add_argument("--db", default="db", help="Chroma persist directory")
+    parser.add_argument("--labels", default=EVAL_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    from vector_index import VectorIndex
+    from embedding_backends import create_embeddings
+
+    vectordb = VectorIndex(args.db, create_embeddings())
+    report = evaluate_vectordb(vectordb, args.db, args.labels)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({k: v for k, v in report.items() if k != "misses"}, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    sys.exit(0 if check_against_baseline(report, args.baseline) else 1)
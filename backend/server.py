@@ -2,23 +2,32 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
 import re
+import json
+import hashlib
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 from supabase import create_client, Client
-from nepali_datetime import datetime as nepali_datetime
 from datetime import datetime
 import uuid
 from dotenv import load_dotenv
 import requests  
+from batch_query import parse_jsonl_items, run_batch, to_jsonl, BATCH_HTTP_MAX_ITEMS
+from caches import student_counts, admin_rosters, chat_session_owners, verified_tokens
+from invalidation import bus as invalidation_bus, start_poller, poller_snapshot
+from session_context import SessionContextStore, USER_SESSION_MAX_AGE
+from chat_log import ChatLogWriter
+from prompt_stats import prompt_stats
+from pagination import postgrest_quote, keyset_filter, encode_cursor, decode_cursor
+import date_convert
+from bulk_import import KINDS as BULK_KINDS, parse_records, run_import as run_bulk_import
 STORAGE_BUCKET = "college-documents"
-from query_llm import CollegeQuerySystem
 
 # ------------------- PyTorch/CUDA Fix -------------------
-import torch
+# Set before torch is (lazily) imported so it never initialises CUDA
 os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
-torch.cuda.is_available = lambda: False
-print("🔧 PyTorch configured to use CPU only")
 
 
 # ------------------- Load Environment Variables -------------------
@@ -28,20 +37,24 @@ load_dotenv()  # This loads the .env file
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Load the embedding model/vector DB in a background thread as soon as the server starts
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() == "true"
 
 # ------------------- Debug Environment Variables -------------------
-print("\n" + "="*60)
-print("🔍 SUPABASE CONFIGURATION CHECK")
-print("="*60)
-print(f"📍 Supabase URL: {SUPABASE_URL[:50]}..." if SUPABASE_URL else "❌ MISSING SUPABASE_URL")
-print(f"🔑 Anon Key: {'✅ Present' if SUPABASE_KEY else '❌ MISSING'} (Length: {len(SUPABASE_KEY) if SUPABASE_KEY else 0})")
-print(f"🔑 Service Key: {'✅ Present' if SUPABASE_SERVICE_KEY else '❌ MISSING'} (Length: {len(SUPABASE_SERVICE_KEY) if SUPABASE_SERVICE_KEY else 0})")
-
-if SUPABASE_KEY:
-    print(f"   Anon Key preview: {SUPABASE_KEY[:20]}...")
-if SUPABASE_SERVICE_KEY:
-    print(f"   Service Key preview: {SUPABASE_SERVICE_KEY[:20]}...")
-print("="*60 + "\n")
+def print_config_check():
+    """Print which Supabase settings are present (run from __main__ only)"""
+    print("\n" + "="*60)
+    print("🔍 SUPABASE CONFIGURATION CHECK")
+    print("="*60)
+    print(f"📍 Supabase URL: {SUPABASE_URL[:50]}..." if SUPABASE_URL else "❌ MISSING SUPABASE_URL")
+    print(f"🔑 Anon Key: {'✅ Present' if SUPABASE_KEY else '❌ MISSING'} (Length: {len(SUPABASE_KEY) if SUPABASE_KEY else 0})")
+    print(f"🔑 Service Key: {'✅ Present' if SUPABASE_SERVICE_KEY else '❌ MISSING'} (Length: {len(SUPABASE_SERVICE_KEY) if SUPABASE_SERVICE_KEY else 0})")
+
+    if SUPABASE_KEY:
+        print(f"   Anon Key preview: {SUPABASE_KEY[:20]}...")
+    if SUPABASE_SERVICE_KEY:
+        print(f"   Service Key preview: {SUPABASE_SERVICE_KEY[:20]}...")
+    print("="*60 + "\n")
 
 # ------------------- Initialize Supabase Clients -------------------
 if not SUPABASE_URL or not SUPABASE_KEY:
@@ -84,6 +97,53 @@ def test_service_key_permissions():
         print(f"❌ Service key test error: {e}")
         return False
 
+# ------------------- Lazy Query System -------------------
+# query_llm pulls in torch, langchain and the embedding model; admin routes
+# never need them, so they are loaded on first use or by the warm-up thread.
+_query_system = None
+_query_system_lock = threading.Lock()
+_warmup_state = {'status': 'cold', 'error': None, 'load_seconds': None}
+
+def get_query_system():
+    """Return the shared CollegeQuerySystem, loading it on first call"""
+    global _query_system
+    if _query_system is not None:
+        return _query_system
+
+    with _query_system_lock:
+        if _query_system is None:
+            _warmup_state['status'] = 'loading'
+            start = time.perf_counter()
+            try:
+                import torch
+                torch.cuda.is_available = lambda: False
+                from query_llm import CollegeQuerySystem
+
+                system = CollegeQuerySystem()
+                # Load every HNSW segment and run one embedding so the first user query is warm
+                index_seconds = system.index.warm_up()
+                print(f"🔥 Vector index warmed up in {index_seconds:.2f}s")
+                _query_system = system
+                _warmup_state['status'] = 'ready'
+                _warmup_state['error'] = None
+            except Exception as e:
+                _warmup_state['status'] = 'failed'
+                _warmup_state['error'] = str(e)
+                raise
+            finally:
+                _warmup_state['load_seconds'] = round(time.perf_counter() - start, 2)
+            print(f"🔥 Query system ready in {_warmup_state['load_seconds']}s")
+    return _query_system
+
+def start_warmup():
+    """Load the query system in a daemon thread so startup isn't blocked"""
+    def _warm():
+        try:
+            get_query_system()
+        except Exception as e:
+            print(f"❌ Query system warm-up failed: {e}")
+    threading.Thread(target=_warm, name="query-system-warmup", daemon=True).start()
+
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 
@@ -186,9 +246,10 @@ def convert_ad_to_bs():
         if not ad_date_str:
             return jsonify({'error': 'AD date is required'}), 400
         
-        ad_date = datetime.strptime(ad_date_str, '%Y-%m-%d')
-        bs_date = nepali_datetime.from_datetime_date(ad_date.date())
-        bs_date_str = bs_date.strftime('%Y-%m-%d')
+        try:
+            bs_date_str = date_convert.ad_to_bs(ad_date_str)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'ad_date': ad_date_str,
@@ -208,16 +269,10 @@ def convert_bs_to_ad():
         if not bs_date_str:
             return jsonify({'error': 'BS date is required'}), 400
         
-        if not re.match(r'^\d{4}-\d{2}-\d{2}$', bs_date_str):
-            return jsonify({'error': 'BS date must be in YYYY-MM-DD format'}), 400
-        
         try:
-            bs_date = nepali_datetime.strptime(bs_date_str, '%Y-%m-%d')
-        except ValueError:
-            return jsonify({'error': 'Invalid BS date'}), 400
-        
-        ad_date = bs_date.to_datetime_date()
-        ad_date_str = ad_date.strftime('%Y-%m-%d')
+            ad_date_str = date_convert.bs_to_ad(bs_date_str)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'bs_date': bs_date_str,
@@ -228,6 +283,19 @@ def convert_bs_to_ad():
         logging.error(f"Error converting BS to AD: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/convert/ad-to-bs/batch', methods=['POST'])
+@app.route('/convert/bs-to-ad/batch', methods=['POST'])
+def convert_dates_batch():
+    """{"dates": [...]} -> {"results": [...]}, one result (or per-item error) per date, in order"""
+    direction = 'ad-to-bs' if request.path.startswith('/convert/ad-to-bs') else 'bs-to-ad'
+    data = request.get_json(silent=True) or {}
+    dates = data.get('dates')
+    if not isinstance(dates, list):
+        return jsonify({'error': "Expected a JSON body like {\"dates\": [\"2080-01-01\", ...]}"}), 400
+    if len(dates) > date_convert.CONVERT_MAX_ITEMS:
+        return jsonify({'error': f"too many dates ({len(dates)}), limit is {date_convert.CONVERT_MAX_ITEMS}"}), 400
+    return jsonify({'results': date_convert.convert_many(dates, direction)})
+
 # ------------------- Title Generation Function -------------------
 def generate_chat_title(question):
     """Generate a meaningful title for chat sessions"""
@@ -435,6 +503,7 @@ def get_query_logs():
                             'user_email': session.get('user_email', 'Unknown'),
                             'user_role': session.get('user_role', 'guest'),
                             'session_id': session['id'],
+                            'query_type': msg.get('query_type'),
                             'status': 'success'
                         })
         
@@ -657,15 +726,127 @@ def reprocess_document(filename):
 
 
 # ------------------- Students CRUD -------------------
+# ------------------- Roster listings -------------------
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+ADMIN_MAX_PAGE_SIZE = 200
+
+# Per table: default projection, columns a client may ask for, search and sort columns
+ROSTERS = {
+    'students_data': {
+        'key': 'students',
+        'fields': ['id', 'name', 'email', 'roll_no', 'program', 'batch', 'section'],
+        'allowed_fields': [
+            'id', 'name', 'email', 'roll_no', 'program', 'batch', 'section', 'year_semester',
+            'gender', 'phone', 'dob_ad', 'dob_bs', 'perm_address', 'temp_address',
+            'symbol_no', 'registration_no', 'joined_date', 'supabase_user_id'
+        ],
+        'search': ['name', 'email', 'roll_no'],
+        'sort': ['name', 'email'],
+    },
+    'teachers_data': {
+        'key': 'teachers',
+        'fields': ['id', 'name', 'email', 'designation'],
+        'allowed_fields': [
+            'id', 'name', 'email', 'designation', 'phone', 'address', 'degree', 'subject', 'supabase_user_id'
+        ],
+        'search': ['name', 'email', 'designation'],
+        'sort': ['name', 'email'],
+    },
+}
+
+def _roster_page(table, args):
+    """One page of a roster: projected columns, optional search, keyset pagination on (sort, id).
+
+    Query args: limit, cursor, q, sort, order (asc|desc), fields (comma separated).
+    Raises ValueError on bad arguments.
+    """
+    roster = ROSTERS[table]
+    limit = min(max(int(args.get('limit', ADMIN_PAGE_SIZE)), 1), ADMIN_MAX_PAGE_SIZE)
+    sort = args.get('sort', 'name')
+    if sort not in roster['sort']:
+        raise ValueError(f"sort must be one of {roster['sort']}")
+    descending = args.get('order', 'asc') == 'desc'
+
+    fields = roster['fields']
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in roster['allowed_fields']]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+    # The cursor needs the sort column and id of the last row
+    select_fields = list(dict.fromkeys(fields + ['id', sort]))
+
+    cursor = args.get('cursor')
+    query = supabase.table(table).select(','.join(select_fields), count=None if cursor else 'exact')
+
+    conditions = []
+    search = (args.get('q') or '').strip()
+    if search:
+        pattern = postgrest_quote(f"*{search}*")
+        conditions.append('or(' + ','.join(f"{col}.ilike.{pattern}" for col in roster['search']) + ')')
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        conditions.append(f"or({keyset_filter(sort, value, last_id, descending)})")
+    if conditions:
+        query = query.or_(f"and({','.join(conditions)})")
+
+    response = query.order(sort, desc=descending).order('id', desc=descending).limit(limit + 1).execute()
+    rows = response.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].get(sort), rows[-1]['id'])
+
+    return {
+        roster['key']: [{f: row.get(f) for f in fields} for row in rows],
+        'next_cursor': next_cursor,
+        'total': response.count,
+    }
+
+def _roster_response(table):
+    """JSON roster page with an ETag; unchanged pages answer 304 and repeat polls skip Supabase"""
+    key = (table, tuple(sorted(request.args.items())))
+    cached = admin_rosters.get(key)
+    if cached is None:
+        body = json.dumps(_roster_page(table, request.args), default=str)
+        cached = (body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+        admin_rosters.set(key, cached)
+
+    body, etag = cached
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers revalidate every time, so polling costs a 304 instead of the whole roster
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def _get_roster_record(table, record_id):
+    """Full row for the edit form"""
+    response = supabase.table(table).select(','.join(ROSTERS[table]['allowed_fields'])).eq('id', record_id).execute()
+    if not response.data:
+        return None
+    return response.data[0]
+
 @app.route('/admin/students', methods=['GET'])
 def get_students():
     try:
-        response = supabase.table('students_data').select('*').order('name').execute()
-        return jsonify({'students': response.data})
+        return _roster_response('students_data')
+    except ValueError as e:
+        return jsonify({'error': str(e), 'students': []}), 400
     except Exception as e:
         logging.error(f"Error fetching students: {str(e)}")
         return jsonify({'error': str(e), 'students': []}), 500
 
+@app.route('/admin/students/<student_id>', methods=['GET'])
+def get_student(student_id):
+    try:
+        student = _get_roster_record('students_data', student_id)
+        if not student:
+            return jsonify({'error': 'Student not found'}), 404
+        return jsonify({'student': student})
+    except Exception as e:
+        logging.error(f"Error fetching student: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/students', methods=['POST'])
 def add_student():
     try:
@@ -754,6 +935,7 @@ def add_student():
         
         if student_response.data:
             print(f"✅ Student created successfully")
+            invalidation_bus.publish('students_data', ids=[student_response.data[0].get('id')], op='insert')
             return jsonify({
                 'success': True,
                 'message': 'Student added successfully! They can now login.',
@@ -796,6 +978,7 @@ def update_student(student_id):
             .execute()
         
         if response.data:
+            invalidation_bus.publish('students_data', ids=[student_id], op='update')
             # Update user metadata if full_name changed
             if data.get('full_name'):
                 try:
@@ -833,6 +1016,7 @@ def delete_student(student_id):
         
         # Delete from students_data
         supabase.table('students_data').delete().eq('id', student_id).execute()
+        invalidation_bus.publish('students_data', ids=[student_id], op='delete')
         
         # Delete from Supabase Auth
         if supabase_user_id:
@@ -854,12 +1038,24 @@ def delete_student(student_id):
 @app.route('/admin/teachers', methods=['GET'])
 def get_teachers():
     try:
-        response = supabase.table('teachers_data').select('*').order('name').execute()
-        return jsonify({'teachers': response.data})
+        return _roster_response('teachers_data')
+    except ValueError as e:
+        return jsonify({'error': str(e), 'teachers': []}), 400
     except Exception as e:
         logging.error(f"Error fetching teachers: {str(e)}")
         return jsonify({'error': str(e), 'teachers': []}), 500
 
+@app.route('/admin/teachers/<teacher_id>', methods=['GET'])
+def get_teacher(teacher_id):
+    try:
+        teacher = _get_roster_record('teachers_data', teacher_id)
+        if not teacher:
+            return jsonify({'error': 'Teacher not found'}), 404
+        return jsonify({'teacher': teacher})
+    except Exception as e:
+        logging.error(f"Error fetching teacher: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/teachers', methods=['POST'])
 def add_teacher():
     try:
@@ -930,6 +1126,7 @@ def add_teacher():
         
         if teacher_response.data:
             print(f"✅ Teacher created successfully")
+            invalidation_bus.publish('teachers_data', ids=[teacher_response.data[0].get('id')], op='insert')
             return jsonify({
                 'success': True,
                 'message': 'Teacher added successfully! They can now login.',
@@ -972,6 +1169,7 @@ def update_teacher(teacher_id):
             .execute()
         
         if response.data:
+            invalidation_bus.publish('teachers_data', ids=[teacher_id], op='update')
             # Update user metadata if full_name changed
             if data.get('full_name'):
                 try:
@@ -1009,6 +1207,7 @@ def delete_teacher(teacher_id):
         
         # Delete from teachers_data
         supabase.table('teachers_data').delete().eq('id', teacher_id).execute()
+        invalidation_bus.publish('teachers_data', ids=[teacher_id], op='delete')
         
         # Delete from Supabase Auth
         if supabase_user_id:
@@ -1026,6 +1225,98 @@ def delete_teacher(teacher_id):
         print(f"❌ Error deleting teacher: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# ------------------- Bulk import -------------------
+IN_FILTER_CHUNK = 200
+
+class SupabaseImportStore:
+    """bulk_import store backed by the service-role client and the Auth admin API"""
+
+    def __init__(self, table):
+        self.table = table
+        # One pooled session shared by the Auth worker threads
+        self.session = requests.Session()
+        self.headers = {
+            'Authorization': f'Bearer {SUPABASE_SERVICE_KEY}',
+            'apikey': SUPABASE_KEY,
+            'Content-Type': 'application/json'
+        }
+
+    def _existing(self, table, column, values):
+        found = []
+        values = list(dict.fromkeys(values))
+        for start in range(0, len(values), IN_FILTER_CHUNK):
+            chunk = values[start:start + IN_FILTER_CHUNK]
+            response = supabase.table(table).select(column).in_(column, chunk).execute()
+            found.extend(row[column] for row in response.data or [])
+        return found
+
+    def existing_emails(self, emails):
+        return self._existing(self.table, 'email', emails)
+
+    def existing_student_ids(self, student_ids):
+        return self._existing('students_data', 'student_id', student_ids)
+
+    def create_auth_user(self, email, password, role, full_name):
+        auth_payload = {
+            "email": email,
+            "password": password,
+            "email_confirm": True,
+            "user_metadata": {"role": role, "full_name": full_name}
+        }
+        response = self.session.post(f"{SUPABASE_URL}/auth/v1/admin/users",
+                                     json=auth_payload, headers=self.headers, timeout=30)
+        if response.status_code != 200:
+            raise Exception(f"Auth API returned {response.status_code}: {response.text}")
+        return response.json()['id']
+
+    def delete_auth_user(self, user_id):
+        self.session.delete(f"{SUPABASE_URL}/auth/v1/admin/users/{user_id}", headers=self.headers, timeout=30)
+
+    def insert_rows(self, table, rows):
+        return supabase.table(table).insert(rows).execute().data or []
+
+    def delete_rows(self, table, ids):
+        for start in range(0, len(ids), IN_FILTER_CHUNK):
+            supabase.table(table).delete().in_('id', ids[start:start + IN_FILTER_CHUNK]).execute()
+
+@app.route('/admin/import/<kind>', methods=['POST'])
+def bulk_import_users(kind):
+    """Import students or teachers from an uploaded CSV/JSONL file (or the raw request body).
+
+    ?dry_run=true validates only; ?atomic=true rolls everything back on any failure.
+    """
+    if kind not in BULK_KINDS:
+        return jsonify({'error': f"Unknown import kind '{kind}', expected one of {list(BULK_KINDS)}"}), 404
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            text = upload.read().decode('utf-8-sig')
+            name = (upload.filename or '').lower()
+            fmt = 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+        else:
+            text = request.get_data(as_text=True)
+            fmt = 'jsonl' if 'json' in (request.content_type or '') else 'csv'
+        fmt = request.args.get('format', fmt)
+        records = parse_records(text, fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    atomic = request.args.get('atomic', 'false').lower() == 'true'
+    try:
+        store = SupabaseImportStore(BULK_KINDS[kind]['table'])
+        print(f"📥 Bulk import of {len(records)} {kind} (dry_run={dry_run}, atomic={atomic})")
+        report = run_bulk_import(kind, records, store, atomic=atomic, dry_run=dry_run)
+        print(f"📥 Bulk import finished: {report['summary']}")
+
+        created = [r['id'] for r in report['results'] if r['status'] == 'created']
+        if created:
+            invalidation_bus.publish(BULK_KINDS[kind]['table'], ids=created, op='insert')
+        return jsonify(report)
+    except Exception as e:
+        logging.error(f"Error in bulk import: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/mark-password-changed', methods=['POST'])
 def mark_password_changed():
     """Mark that user has changed their password"""
@@ -1155,8 +1446,57 @@ def get_analytics():
         return jsonify({'error': str(e)}), 500
 
 # ------------------- LLM Query Route -------------------
+# Write-behind chat history: /api/query never waits on the chat_messages insert
+chat_log = ChatLogWriter(lambda rows: supabase.table('chat_messages').insert(rows).execute())
+
+def _requesting_user_id():
+    """Auth user id behind the request's Supabase access token, or None"""
+    header = request.headers.get('Authorization', '')
+    token = header[len('Bearer '):] if header.startswith('Bearer ') else None
+    if not token:
+        return None
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user_id = verified_tokens.get(key)
+    if user_id is None:
+        try:
+            user = supabase.auth.get_user(token)
+        except Exception as e:
+            print(f"⚠️ Access token rejected: {e}")
+            return None
+        user_id = user.user.id if user and user.user else None
+        if user_id:
+            verified_tokens.set(key, user_id)
+    return user_id
+
+def _chat_log_session(session_id):
+    """session_id if its turns may be logged for this request, else None.
+
+    The chat log writes with the service role, so RLS can't stop a client from
+    appending to someone else's session: only the session's owner gets logged.
+    """
+    if not session_id or session_id.startswith(('guest-', 'local-')):
+        return None
+    user_id = _requesting_user_id()
+    if not user_id:
+        return None
+    owner = chat_session_owners.get(session_id)
+    if owner is None:
+        try:
+            rows = supabase.table('chat_sessions').select('user_id').eq('id', session_id).limit(1).execute().data
+        except Exception as e:
+            print(f"⚠️ Chat session lookup failed: {e}")
+            return None
+        owner = rows[0]['user_id'] if rows else None
+        if owner:
+            chat_session_owners.set(session_id, owner)
+    if owner != user_id:
+        print(f"⚠️ Session {session_id} does not belong to the requester; not logging it")
+        return None
+    return session_id
+
 @app.route('/api/query', methods=['POST'])
 def handle_query():
+    log_session, query, started = None, None, time.perf_counter()
     try:
         data = request.get_json()
         query = data.get('query', '')
@@ -1164,6 +1504,12 @@ def handle_query():
         user_data = data.get('user_data', None)
         session_id = data.get('session_id', None)
         is_guest = data.get('is_guest', True)
+
+        # Logged-in clients send the context_id from /api/user-data instead of their whole profile
+        context_id = data.get('context_id')
+        context = user_sessions.get(context_id) if context_id else None
+        if context:
+            user_role, user_data, is_guest = context['role'], context['user_data'], False
         
         print(f"🔍 Received query:")
         print(f"   - Role: {user_role}")
@@ -1174,11 +1520,18 @@ def handle_query():
         if not query:
             return jsonify({'error': 'No query provided'}), 400
         
-        # Initialize query system
-        system = CollegeQuerySystem()
+        log_session = _chat_log_session(session_id)
+        system = get_query_system()
         
         print(f"🔄 Calling LLM with user_role: {user_role}")
-        response = system.generate_response(query, user_role, user_data)
+        started = time.perf_counter()
+        response, route = system.generate_response(query, user_role, user_data, session_id=session_id,
+                                                   with_route=True)
+        latency_ms = round((time.perf_counter() - started) * 1000)
+
+        if log_session:
+            # Queued; the chat_log writer thread inserts it with the next batch
+            chat_log.log_turn(log_session, query, response, latency_ms, query_type=route)
         
         # Generate suggested title
         suggested_title = generate_chat_title(query)
@@ -1202,12 +1555,17 @@ def handle_query():
             'user_role': user_role,
             'suggested_title': suggested_title,
             'session_id': session_id,
-            'is_guest': is_guest
+            'is_guest': is_guest,
+            # Tells the client to call /api/user-data again for a new context_id
+            'context_expired': bool(context_id) and context is None
         })
         
     except Exception as e:
         logging.error(f"❌ Error in /api/query: {str(e)}")
         print(f"💥 Error processing query: {str(e)}")
+        if log_session and query:
+            # The question is still part of the conversation
+            chat_log.log_turn(log_session, query, None, round((time.perf_counter() - started) * 1000))
         
         return jsonify({
             'error': str(e),
@@ -1215,7 +1573,46 @@ def handle_query():
             'access_restricted': False
         }), 500
 
+@app.route('/api/query/batch', methods=['POST'])
+def handle_query_batch():
+    """Answer many questions: JSONL in, JSONL out (or {"questions": [...]} in, JSON out).
+
+    Capped at BATCH_HTTP_MAX_ITEMS to bound the request's latency and its load on
+    Groq and the LLM pool; regression runs and precomputation go through batch_query.py instead.
+    """
+    try:
+        json_body = request.get_json(silent=True) if request.is_json else None
+        try:
+            if isinstance(json_body, dict):
+                raw = json_body.get('items') or json_body.get('questions') or []
+                items = parse_jsonl_items((json.dumps(q) for q in raw), BATCH_HTTP_MAX_ITEMS)
+            else:
+                items = parse_jsonl_items(request.get_data(as_text=True).splitlines(), BATCH_HTTP_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not items:
+            return jsonify({'error': 'No questions provided'}), 400
+
+        print(f"📦 Batch query: {len(items)} questions")
+        rows = run_batch(get_query_system(), items)
+
+        if isinstance(json_body, dict):
+            return jsonify({'results': rows})
+        return app.response_class(to_jsonl(rows), mimetype='application/x-ndjson')
+
+    except Exception as e:
+        logging.error(f"❌ Error in /api/query/batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ------------------- User Data Route -------------------
+def _load_profile(table, email):
+    response = supabase.table(table).select('*').eq('email', email).limit(1).execute()
+    return response.data[0] if response.data else None
+
+# Profiles of logged-in chat users, keyed by the context_id handed out below
+user_sessions = SessionContextStore(_load_profile)
+
 @app.route('/api/user-data', methods=['POST'])
 def get_user_data():
     try:
@@ -1226,18 +1623,25 @@ def get_user_data():
         if not email or not table:
             return jsonify({'error': 'Email and table required'}), 400
         
-        system = CollegeQuerySystem()
-        user_data = system._query_supabase(table, params={"email": f"eq.{email}"})
-        
-        if user_data:
-            return jsonify({'user_data': user_data[0]})
-        else:
-            return jsonify({'user_data': None})
+        try:
+            context_id, user_data = user_sessions.open(email, table)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # The client asks for a new context_id before this runs out
+        return jsonify({'user_data': user_data, 'context_id': context_id,
+                        'context_expires_in': USER_SESSION_MAX_AGE if context_id else None})
             
     except Exception as e:
         logging.error("Error fetching user data: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/user-data/<context_id>', methods=['DELETE'])
+def close_user_context(context_id):
+    """Forget a context on logout"""
+    user_sessions.close(context_id)
+    return jsonify({'success': True})
+
 
 # ------------------- Health Check -------------------
 @app.route('/health', methods=['GET'])
@@ -1248,12 +1652,40 @@ def health_check():
         'timestamp': datetime.now().isoformat(),
         'total_queries': system_stats['total_queries'],
         'successful_queries': system_stats['successful_queries'],
-        'uptime_hours': (datetime.now() - system_stats['start_time']).total_seconds() / 3600
+        'uptime_hours': (datetime.now() - system_stats['start_time']).total_seconds() / 3600,
+        'coalescing': _query_system.coalescing_stats() if _query_system else None,
+        'llm_circuits': {
+            'fast': _query_system.fast_chain.breaker.snapshot(),
+            'large': _query_system.chain.breaker.snapshot()
+        } if _query_system else None,
+        'prompts': prompt_stats.snapshot(),
+        'student_count_cache': student_counts.snapshot(),
+        'invalidation': {'bus': invalidation_bus.snapshot(), 'poller': poller_snapshot()},
+        'user_sessions': user_sessions.snapshot(),
+        'chat_log': chat_log.snapshot()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: 200 only once the query system (model + vector DB) is loaded"""
+    ready = _warmup_state['status'] == 'ready'
+    return jsonify({
+        'ready': ready,
+        'status': _warmup_state['status'],
+        'error': _warmup_state['error'],
+        'load_seconds': _warmup_state['load_seconds']
+    }), 200 if ready else 503
+
 # ------------------- Main -------------------
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
+    print_config_check()
+    # Under the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Picks up student/teacher changes made outside this process (fill.py, dashboard edits)
+        start_poller()
+        if WARMUP_ON_START:
+            start_warmup()
     print("🚀 Flask server starting on http://127.0.0.1:5000")
     print("📝 Using Supabase Auth for authentication")
     print("🔓 Only highly sensitive security information is restricted")
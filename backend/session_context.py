@@ -0,0 +1,142 @@
+"""Server-side profile cache for logged-in chat users.
+
+/api/user-data looks the profile up once and hands back an opaque
+context_id. /api/query then sends only that id; the profile and role come
+from here. A loaded profile is reused for USER_SESSION_TTL seconds, the same
+short TTL the admin rosters use while profile edits made on other workers
+can't reach this one (see caches.py); after that it is loaded again. A
+profile change published on the invalidation bus marks matching entries
+stale sooner.
+
+Each gunicorn worker keeps its own cache, so the context_id is not a random
+key: it carries the profile table, email and issue time, signed with
+USER_SESSION_SECRET. A worker that has not seen the id checks the signature
+and loads the profile itself. Ids older than USER_SESSION_MAX_AGE are
+refused, and the client asks for a new one before then. Logging out
+only drops one worker's copy, so MAX_AGE is kept short: it is how long a
+logged-out id can still be used elsewhere.
+"""
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+
+from caches import TTLCache, tracked_ttl, ADMIN_ROSTER_TTL
+from invalidation import bus
+
+USER_SESSION_TTL = float(os.getenv("USER_SESSION_TTL", str(ADMIN_ROSTER_TTL)))
+USER_SESSION_TRACKED_TTL = float(os.getenv("USER_SESSION_TRACKED_TTL", "300"))
+USER_SESSION_MAX = int(os.getenv("USER_SESSION_MAX", "10000"))
+USER_SESSION_MAX_AGE = float(os.getenv("USER_SESSION_MAX_AGE", "900"))
+# Every worker must sign with the same key: USER_SESSION_SECRET, else one derived
+# from the service role key, else a random one (shared by workers via preload_app)
+_SECRET = (
+    os.getenv("USER_SESSION_SECRET")
+    or (os.getenv("SUPABASE_SERVICE_ROLE_KEY") and
+        hmac.new(os.getenv("SUPABASE_SERVICE_ROLE_KEY").encode(), b"session-context", hashlib.sha256).hexdigest())
+    or secrets.token_hex(32)
+).encode()
+
+# Profile table -> role it grants
+PROFILE_TABLES = {
+    "students_data": "student",
+    "teachers_data": "teacher",
+    "admin_users": "admin",
+}
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _sign(payload):
+    return _b64(hmac.new(_SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+def make_context_id(table, email, issued_at=None):
+    payload = _b64(json.dumps([table, email, int(issued_at or time.time())], separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_context_id(context_id):
+    """(table, email) from a context_id this server signed, or None if forged, malformed or too old"""
+    payload, _, signature = str(context_id).partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        table, email, issued_at = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if table not in PROFILE_TABLES or time.time() - issued_at > USER_SESSION_MAX_AGE:
+        return None
+    return table, email
+
+
+class SessionContextStore:
+    """context_id -> {"table", "email", "role", "user_data", "stale"}"""
+
+    def __init__(self, loader, ttl=None, max_entries=USER_SESSION_MAX):
+        self.loader = loader  # loader(table, email) -> profile row or None
+        # admin_users is never polled, so admin contexts always use the short TTL
+        self.cache = TTLCache(ttl or tracked_ttl(USER_SESSION_TTL, USER_SESSION_TRACKED_TTL, *PROFILE_TABLES),
+                              max_entries)
+        self.reloads = 0
+        for table in PROFILE_TABLES:
+            bus.subscribe(table, self._on_change)
+
+    def open(self, email, table):
+        """Look the profile up and start a context; (context_id, user_data), or (None, None) if unknown"""
+        if table not in PROFILE_TABLES:
+            raise ValueError(f"Unknown profile table '{table}'")
+        email = email.strip()
+        user_data = self.loader(table, email)
+        if not user_data:
+            return None, None
+        context_id = make_context_id(table, email)
+        self.cache.set(context_id, {"table": table, "email": email, "role": PROFILE_TABLES[table],
+                                    "user_data": user_data, "stale": False})
+        return context_id, user_data
+
+    def get(self, context_id):
+        """The context for context_id (reloading an expired or stale profile), or None once the id has expired"""
+        identity = read_context_id(context_id) if context_id else None
+        if identity is None:
+            self.cache.pop(context_id)
+            return None
+        ctx = self.cache.get(context_id)
+        if ctx is None:
+            # Opened by another worker, or loaded more than the TTL ago: load it again
+            table, email = identity
+            ctx = {"table": table, "email": email, "role": PROFILE_TABLES[table], "user_data": None, "stale": True}
+        if ctx["stale"]:
+            user_data = self.loader(ctx["table"], ctx["email"])
+            self.reloads += 1
+            if not user_data:
+                # The profile was deleted
+                self.cache.pop(context_id)
+                return None
+            ctx = {**ctx, "user_data": user_data, "stale": False}
+            self.cache.set(context_id, ctx)  # expiry counts from the load, not from each use
+        return ctx
+
+    def close(self, context_id):
+        """Drop this worker's copy; other workers accept the id until it is USER_SESSION_MAX_AGE old"""
+        self.cache.pop(context_id)
+
+    def _on_change(self, event):
+        ids = set(event["ids"] or [])
+
+        def _mark(ctx):
+            if ctx["table"] != event["table"]:
+                return ctx
+            if ids and (ctx["user_data"] or {}).get("id") not in ids:
+                return ctx
+            return {**ctx, "stale": True}
+
+        self.cache.update(_mark)
+
+    def snapshot(self):
+        return {**self.cache.snapshot(), "reloads": self.reloads}
@@ -0,0 +1,73 @@
+"""Compare the markdown section splitter with the old recursive splitter.
+
+    python splitter_bench.py              # split timing + retrieval quality per chunker
+    python splitter_bench.py --no-index   # split timing and chunk stats only
+
+Each chunker's chunks are indexed into a throwaway Chroma directory and scored
+with the retrieval_eval.jsonl questions, so the numbers are comparable with
+retrieval_baseline.json.
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from create_database import CHUNKERS, load_and_process_md_files, create_vector_store
+from retrieval_eval import evaluate_vectordb
+
+
+def _split_stats(chunker, directory, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        texts = load_and_process_md_files(directory, chunker=chunker)
+        timings.append((time.perf_counter() - start) * 1000)
+    sizes = sorted(len(t.page_content) for t in texts)
+    timings.sort()
+    return texts, {
+        "chunker": chunker,
+        "split_ms": round(timings[len(timings) // 2], 2),
+        "chunks": len(texts),
+        "mean_chars": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "max_chars": sizes[-1] if sizes else 0,
+    }
+
+
+def run(chunkers, directory="data", rounds=5, index=True):
+    results = []
+    for chunker in chunkers:
+        texts, stats = _split_stats(chunker, directory, rounds)
+        if index and texts:
+            persist_directory = tempfile.mkdtemp(prefix=f"bench_{chunker}_")
+            try:
+                vectordb = create_vector_store(texts, persist_directory)
+                report = evaluate_vectordb(vectordb, persist_directory)
+                stats.update({k: report[k] for k in ("recall@1", "recall@3", "recall@5", "mrr", "mean_latency_ms")})
+            finally:
+                shutil.rmtree(persist_directory, ignore_errors=True)
+        results.append(stats)
+
+    columns = [c for c in ("chunker", "split_ms", "chunks", "mean_chars", "recall@1", "recall@3", "mrr", "mean_latency_ms")
+               if any(c in r for r in results)]
+    print("\n" + "".join(f"{c:>16}" for c in columns))
+    for r in results:
+        print("".join(f"{str(r.get(c, '-')):>16}" for c in columns))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark document splitters")
+    parser.add_argument("chunkers", nargs="*", default=list(CHUNKERS))
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--no-index", action="store_true", help="skip indexing and retrieval evaluation")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data):
+        parser.error(f"data directory '{args.data}' not found")
+    results = run(args.chunkers, args.data, args.rounds, index=not args.no_index)
+    if args.json:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,177 @@
+import os
+import time
+import shutil
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+# ---------------- Index layout config ----------------
+# "single": every program in one collection, program picked by a where clause.
+# "per_program": one collection (and HNSW graph) per program; unscoped queries fan out.
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "single")
+LAYOUTS = ("single", "per_program")
+
+DEFAULT_COLLECTION = "langchain"  # langchain_chroma's default collection name
+PROGRAM_COLLECTION_PREFIX = "program_"
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "description": "Enhanced Samriddhi College information database"
+}
+
+# HNSW graph parameters (Chroma defaults). construction_ef and M are fixed when a
+# collection is built, so changing any of them needs a rebuild; hnsw_sweep.py
+# shows the recall/latency trade-off on our corpus.
+HNSW_PARAMS = {
+    "hnsw:construction_ef": int(os.getenv("HNSW_CONSTRUCTION_EF", "100")),
+    "hnsw:search_ef": int(os.getenv("HNSW_SEARCH_EF", "10")),
+    "hnsw:M": int(os.getenv("HNSW_M", "16")),
+}
+
+
+def program_collection(program):
+    return f"{PROGRAM_COLLECTION_PREFIX}{program}"
+
+
+def where_program(where):
+    """Program named by a where clause (top level or inside $and), if any"""
+    if not where:
+        return None
+    if "program" in where:
+        return where["program"]
+    for condition in where.get("$and", []):
+        if "program" in condition:
+            return condition["program"]
+    return None
+
+
+class VectorIndex:
+    """The Chroma index in either layout, behind one search interface.
+
+    Chroma handles are opened per call (as get_vectordb always did) so nothing
+    created before a gunicorn fork is reused in the workers.
+    """
+
+    def __init__(self, persist_directory="db", embedding=None, layout=None, hnsw=None):
+        self.persist_directory = persist_directory
+        self.embedding = embedding
+        self.layout = layout or INDEX_LAYOUT
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown INDEX_LAYOUT '{self.layout}', expected one of {list(LAYOUTS)}")
+        # Only used when building; an existing index keeps the parameters it was built with
+        self.collection_metadata = {**COLLECTION_METADATA, **HNSW_PARAMS, **(hnsw or {})}
+        self._programs = None
+
+    # ---------- collections ----------
+    def programs(self):
+        """Programs that have their own collection (per_program layout)"""
+        if self._programs is None:
+            client = chromadb.PersistentClient(path=self.persist_directory)
+            names = [getattr(c, "name", c) for c in client.list_collections()]
+            self._programs = sorted(
+                n[len(PROGRAM_COLLECTION_PREFIX):] for n in names if n.startswith(PROGRAM_COLLECTION_PREFIX)
+            )
+        return self._programs
+
+    def store(self, program=None):
+        """LangChain Chroma store for a program's collection, or the single collection"""
+        name = program_collection(program) if self.layout == "per_program" else DEFAULT_COLLECTION
+        return Chroma(
+            collection_name=name,
+            persist_directory=self.persist_directory,
+            embedding_function=self.embedding
+        )
+
+    def _stores_for(self, where):
+        if self.layout == "single":
+            return [self.store()]
+        program = where_program(where)
+        if program in self.programs():
+            return [self.store(program)]
+        # Unscoped (or unknown program): search every program graph and merge
+        return [self.store(p) for p in self.programs()]
+
+    # ---------- search ----------
+    def search_by_vectors(self, vectors, k, where=None):
+        """[(doc, relevance)] best first for each query vector"""
+        results = [[] for _ in vectors]
+        for store in self._stores_for(where):
+            kwargs = {
+                "query_embeddings": vectors,
+                "n_results": k,
+                "include": ["documents", "metadatas", "distances"]
+            }
+            if where:
+                kwargs["where"] = where
+            res = store._collection.query(**kwargs)
+            for row in range(len(vectors)):
+                # Cosine space: relevance = 1 - distance, as similarity_search_with_relevance_scores
+                results[row].extend(
+                    (Document(page_content=doc, metadata=meta or {}), 1.0 - dist)
+                    for doc, meta, dist in zip(res["documents"][row], res["metadatas"][row], res["distances"][row])
+                )
+        return [sorted(hits, key=lambda hit: hit[1], reverse=True)[:k] for hits in results]
+
+    def search(self, question, k, where=None):
+        return self.search_by_vectors([self.embedding.embed_query(question)], k, where)[0]
+
+    def similarity_search(self, question, k=4):
+        return [doc for doc, _ in self.search(question, k)]
+
+    def warm_up(self):
+        """Run one query against every collection so its HNSW segment is loaded from disk"""
+        start = time.perf_counter()
+        vector = self.embedding.embed_query("warm up")
+        for store in self._stores_for(None):
+            if store._collection.count():
+                store._collection.query(query_embeddings=[vector], n_results=1, include=[])
+        return time.perf_counter() - start
+
+    # ---------- inspection ----------
+    def count(self):
+        return sum(store._collection.count() for store in self._stores_for(None))
+
+    def get(self):
+        """Metadata of every chunk across collections"""
+        metadatas = []
+        for store in self._stores_for(None):
+            metadatas.extend(store.get(include=["metadatas"])["metadatas"])
+        return {"metadatas": metadatas}
+
+    # ---------- building ----------
+    def build(self, texts, programs=None):
+        """Index texts from scratch; with programs (per_program only) rebuild just those collections"""
+        if programs and self.layout != "per_program":
+            raise ValueError("Re-indexing single programs needs INDEX_LAYOUT=per_program")
+
+        if not programs and os.path.exists(self.persist_directory):
+            shutil.rmtree(self.persist_directory)
+            print("🗑️  Removed existing database")
+
+        if self.layout == "single":
+            Chroma.from_documents(
+                documents=texts,
+                embedding=self.embedding,
+                persist_directory=self.persist_directory,
+                collection_metadata=self.collection_metadata
+            )
+        else:
+            groups = {}
+            for text in texts:
+                groups.setdefault(text.metadata["program"], []).append(text)
+            for program, docs in groups.items():
+                if programs and program not in programs:
+                    continue
+                if programs:
+                    # Drop only this program's collection; the others stay untouched
+                    self.store(program).delete_collection()
+                Chroma.from_documents(
+                    documents=docs,
+                    embedding=self.embedding,
+                    collection_name=program_collection(program),
+                    persist_directory=self.persist_directory,
+                    collection_metadata=self.collection_metadata
+                )
+                print(f"   📁 {program_collection(program)}: {len(docs)} chunks")
+        self._programs = None
+        return self
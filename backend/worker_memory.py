@@ -0,0 +1,58 @@
+"""Memory-per-worker report for the gunicorn deployment.
+
+Usage: python worker_memory.py [gunicorn.pid]
+
+RSS counts shared pages in every process; PSS splits them between the
+processes sharing them, so the PSS total is the real footprint.
+"""
+import os
+import sys
+
+
+def _smaps_rollup(pid):
+    stats = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                stats[parts[0].rstrip(":")] = int(parts[1])
+    return stats
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def memory_report(master_pid):
+    """Return RSS/PSS/shared/private (MB) for the master and each worker"""
+    rows = []
+    for role, pid in [("master", master_pid)] + [("worker", p) for p in _children(master_pid)]:
+        try:
+            s = _smaps_rollup(pid)
+        except OSError:
+            continue
+        shared = s.get("Shared_Clean", 0) + s.get("Shared_Dirty", 0)
+        private = s.get("Private_Clean", 0) + s.get("Private_Dirty", 0)
+        rows.append({
+            "role": role,
+            "pid": pid,
+            "rss_mb": round(s.get("Rss", 0) / 1024, 1),
+            "pss_mb": round(s.get("Pss", 0) / 1024, 1),
+            "shared_mb": round(shared / 1024, 1),
+            "private_mb": round(private / 1024, 1),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    pidfile = sys.argv[1] if len(sys.argv) > 1 else os.getenv("GUNICORN_PIDFILE", "gunicorn.pid")
+    with open(pidfile, "r") as f:
+        master_pid = int(f.read().strip())
+
+    rows = memory_report(master_pid)
+    print(f"{'role':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'shared MB':>12}{'private MB':>12}")
+    for r in rows:
+        print(f"{r['role']:<8}{r['pid']:>8}{r['rss_mb']:>10}{r['pss_mb']:>10}{r['shared_mb']:>12}{r['private_mb']:>12}")
+    print(f"📊 Total PSS: {sum(r['pss_mb'] for r in rows):.1f} MB across {len(rows)} processes")
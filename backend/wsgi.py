@@ -0,0 +1,17 @@
+"""Production WSGI entry point.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py sets preload_app, so this module is imported once in the
+master process. The embedding model and tokenizer are loaded here, before
+the workers fork, and every worker shares those pages copy-on-write.
+"""
+import gc
+
+from server import app, get_query_system
+
+get_query_system()
+
+# Move everything loaded so far out of the GC's generations so collections in
+# the workers don't touch (and un-share) the preloaded objects.
+gc.freeze()
@@ -512,6 +512,11 @@ const AdminDashboard = () => {
   const [queries, setQueries] = useState([]);
   const [students, setStudents] = useState([]);
   const [teachers, setTeachers] = useState([]);
+  // Roster paging: cursor for the next page (null when done) and the total from the first page
+  const [studentsCursor, setStudentsCursor] = useState(null);
+  const [teachersCursor, setTeachersCursor] = useState(null);
+  const [studentsTotal, setStudentsTotal] = useState(0);
+  const [teachersTotal, setTeachersTotal] = useState(0);
   const [analytics, setAnalytics] = useState({});
   const [activeTab, setActiveTab] = useState("overview");
 
@@ -626,26 +631,39 @@ const AdminDashboard = () => {
     }
   };
 
-  const fetchStudents = async () => {
+  // Search and paging happen on the server; append=true loads the page after the cursor
+  const rosterUrl = (path, cursor) => {
+    const params = new URLSearchParams();
+    if (userSearchQuery.trim()) params.set("q", userSearchQuery.trim());
+    if (cursor) params.set("cursor", cursor);
+    const query = params.toString();
+    return `${API_BASE}${path}${query ? `?${query}` : ""}`;
+  };
+
+  const fetchStudents = async (append = false) => {
     try {
       console.log("👥 Fetching students...");
-      const res = await fetch(`${API_BASE}/admin/students`);
+      const res = await fetch(rosterUrl("/admin/students", append ? studentsCursor : null));
       if (!res.ok) throw new Error("Students API failed");
       const data = await res.json();
       console.log("👥 Students received:", data.students?.length || 0);
-      setStudents(data.students || []);
+      setStudents((prev) => (append ? [...prev, ...(data.students || [])] : data.students || []));
+      setStudentsCursor(data.next_cursor || null);
+      if (!append) setStudentsTotal(data.total ?? (data.students || []).length);
     } catch (err) {
       console.error(err);
       setError(err.message);
     }
   };
 
-  const fetchTeachers = async () => {
+  const fetchTeachers = async (append = false) => {
     try {
-      const res = await fetch(`${API_BASE}/admin/teachers`);
+      const res = await fetch(rosterUrl("/admin/teachers", append ? teachersCursor : null));
       if (!res.ok) throw new Error("Teachers API failed");
       const data = await res.json();
-      setTeachers(data.teachers || []);
+      setTeachers((prev) => (append ? [...prev, ...(data.teachers || [])] : data.teachers || []));
+      setTeachersCursor(data.next_cursor || null);
+      if (!append) setTeachersTotal(data.total ?? (data.teachers || []).length);
     } catch (err) {
       console.error(err);
       setError(err.message);
@@ -696,6 +714,16 @@ const AdminDashboard = () => {
     fetchDataForTab(activeTab);
   }, [activeTab]);
 
+  // Re-query the rosters when the search text settles
+  useEffect(() => {
+    if (activeTab !== "users") return;
+    const timer = setTimeout(() => {
+      fetchStudents();
+      fetchTeachers();
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [userSearchQuery]);
+
   // ----------------- Handlers -----------------
   const handleLogout = () => {
     localStorage.removeItem("userRole");
@@ -704,18 +732,9 @@ const AdminDashboard = () => {
     navigate("/login");
   };
 
-  // Filter users based on search query
-  const filteredStudents = students.filter((student) =>
-    student.name.toLowerCase().includes(userSearchQuery.toLowerCase()) ||
-    student.email.toLowerCase().includes(userSearchQuery.toLowerCase()) ||
-    (student.roll_no && student.roll_no.toLowerCase().includes(userSearchQuery.toLowerCase()))
-  );
-
-  const filteredTeachers = teachers.filter((teacher) =>
-    teacher.name.toLowerCase().includes(userSearchQuery.toLowerCase()) ||
-    teacher.email.toLowerCase().includes(userSearchQuery.toLowerCase()) ||
-    (teacher.designation && teacher.designation.toLowerCase().includes(userSearchQuery.toLowerCase()))
-  );
+  // Rosters arrive already filtered by the search query
+  const filteredStudents = students;
+  const filteredTeachers = teachers;
 
   // ----------------- Document Management Handlers -----------------
 const handleFileUpload = async (e) => {
@@ -926,7 +945,15 @@ const handleAddTeacher = async (e) => {
 };
 
 // ----------------- Edit Handlers -----------------
-const handleEditStudent = (student) => {
+const handleEditStudent = async (listedStudent) => {
+  // The roster only carries list columns; load the full record for the form
+  let student = listedStudent;
+  try {
+    const res = await fetch(`${API_BASE}/admin/students/${listedStudent.id}`);
+    if (res.ok) student = (await res.json()).student || listedStudent;
+  } catch (err) {
+    console.error(err);
+  }
   setEditingStudent(student);
   // Create a clean form data object without the id field
   const formData = {
@@ -958,7 +985,15 @@ const handleEditStudent = (student) => {
   setShowStudentModal(true);
 };
 
-const handleEditTeacher = (teacher) => {
+const handleEditTeacher = async (listedTeacher) => {
+  // The roster only carries list columns; load the full record for the form
+  let teacher = listedTeacher;
+  try {
+    const res = await fetch(`${API_BASE}/admin/teachers/${listedTeacher.id}`);
+    if (res.ok) teacher = (await res.json()).teacher || listedTeacher;
+  } catch (err) {
+    console.error(err);
+  }
   setEditingTeacher(teacher);
   // Create a clean form data object without the id field
   const formData = {
@@ -1316,7 +1351,7 @@ const handleEditTeacher = (teacher) => {
             <div className="users-grid">
               {/* Students List */}
               <div className="users-section">
-                <h3>Students ({filteredStudents.length})</h3>
+                <h3>Students ({studentsTotal})</h3>
                 {filteredStudents.length === 0 ? (
                   <div className="empty-state small">
                     <p>{userSearchQuery ? "No students found matching your search" : "No students found"}</p>
@@ -1348,13 +1383,18 @@ const handleEditTeacher = (teacher) => {
                         </div>
                       </div>
                     ))}
+                    {studentsCursor && (
+                      <button className="btn-secondary load-more" onClick={() => fetchStudents(true)}>
+                        Load more ({studentsTotal - filteredStudents.length} remaining)
+                      </button>
+                    )}
                   </div>
                 )}
               </div>
 
               {/* Teachers List */}
               <div className="users-section">
-                <h3>Teachers ({filteredTeachers.length})</h3>
+                <h3>Teachers ({teachersTotal})</h3>
                 {filteredTeachers.length === 0 ? (
                   <div className="empty-state small">
                     <p>{userSearchQuery ? "No teachers found matching your search" : "No teachers found"}</p>
@@ -1385,6 +1425,11 @@ const handleEditTeacher = (teacher) => {
                         </div>
                       </div>
                     ))}
+                    {teachersCursor && (
+                      <button className="btn-secondary load-more" onClick={() => fetchTeachers(true)}>
+                        Load more ({teachersTotal - filteredTeachers.length} remaining)
+                      </button>
+                    )}
                   </div>
                 )}
               </div>
@@ -5,12 +5,12 @@ import {
   logoutUser,
   getCurrentUserWithRole,
   createChatSession,
-  saveChatMessage,
   getUserChatSessions,
   getChatMessages,
   updateChatSessionTitle,
   deleteChatSession,
 } from "../../utils/auth";
+import { supabase } from "../../utils/supabase";
 import Loader from "../Loader/Loader";
 import "./ChatBot.css";
 
@@ -115,6 +115,9 @@ function ChatBot() {
   });
   const [userRole, setUserRole] = useState("guest");
   const [userData, setUserData] = useState(null);
+  // Server-side handle for userData; sent with each query instead of the profile
+  const [contextId, setContextId] = useState(null);
+  const [contextExpiresAt, setContextExpiresAt] = useState(0);
   const [currentSessionId, setCurrentSessionId] = useState(() => {
     return localStorage.getItem("currentSessionId") || null;
   });
@@ -147,6 +150,9 @@ function ChatBot() {
   const navigate = useNavigate();
   const messagesEndRef = useRef(null);
   const recognitionRef = useRef(null);
+  // Messages of this tab's turns, per session. The backend writes chat_messages
+  // a couple of seconds after answering, so a reload may not have them yet.
+  const pendingMessagesRef = useRef({});
 
   // Initialize user info and speech recognition
   useEffect(() => {
@@ -320,11 +326,19 @@ function ChatBot() {
         if (response.ok) {
           const data = await response.json();
           setUserData(data.user_data);
+          setContextId(data.context_id || null);
+          setContextExpiresAt(
+            data.context_expires_in
+              ? Date.now() + data.context_expires_in * 1000
+              : 0
+          );
+          return data.context_id || null;
         }
       }
     } catch (error) {
       console.error("Error fetching user data:", error);
     }
+    return null;
   };
 
   // Function to load chat history
@@ -370,6 +384,16 @@ function ChatBot() {
   };
 
   // Function to load a specific chat session
+  // Saved messages plus this tab's recent ones the backend hasn't written yet
+  const withPendingMessages = (sessionId, saved) => {
+    const pending = (pendingMessagesRef.current[sessionId] || []).filter(
+      (msg) =>
+        !saved.some((s) => s.sender === msg.sender && s.text === msg.text)
+    );
+    pendingMessagesRef.current[sessionId] = pending;
+    return [...saved, ...pending];
+  };
+
   const loadChatSession = async (sessionId) => {
     try {
       const { data, error } = await getChatMessages(sessionId);
@@ -383,7 +407,7 @@ function ChatBot() {
           timestamp: new Date(msg.created_at),
         }));
 
-        setMessages(formattedMessages);
+        setMessages(withPendingMessages(sessionId, formattedMessages));
         setCurrentSessionId(sessionId);
         setSidebarOpen(false);
       }
@@ -440,7 +464,9 @@ function ChatBot() {
             }));
 
             console.log("✅ Session restored with", data.length, "messages");
-            setMessages(formattedMessages);
+            setMessages(
+              withPendingMessages(currentSessionId, formattedMessages)
+            );
           }
         } catch (error) {
           console.error("💥 Error restoring session:", error);
@@ -552,47 +578,48 @@ function ChatBot() {
         console.log("   - isGuestUser:", isGuestUser);
         console.log("   - userRole:", userRole);
 
-        if (
-          !isGuestUser &&
-          !sessionId.startsWith("guest-") &&
-          !sessionId.startsWith("local-")
-        ) {
-          console.log("💾 Saving user message to session:", sessionId);
-          try {
-            const { error } = await saveChatMessage(
-              sessionId,
-              currentQuery,
-              "user"
-            );
-            if (error) {
-              console.error("❌ Error saving user message:", error);
-            } else {
-              console.log("✅ User message saved to database");
-            }
-          } catch (error) {
-            console.error("💥 Error saving message:", error);
-          }
-        }
+        // The backend saves both the question and the reply to chat_messages
 
         const actualUserRole = localStorage.getItem("userRole") || "guest";
         const actualIsGuest = actualUserRole === "guest";
 
         console.log("📤 Using role from localStorage:", actualUserRole);
 
+        // Context ids are short-lived; renew one that is about to run out
+        let activeContextId = contextId;
+        if (contextId && contextExpiresAt - Date.now() < 60000) {
+          const storedEmail =
+            localStorage.getItem("userEmail") ||
+            localStorage.getItem("adminEmail");
+          activeContextId = storedEmail
+            ? await fetchUserData(storedEmail, actualUserRole)
+            : null;
+        }
+
         const requestData = {
           query: currentQuery,
           user_role: actualUserRole,
-          user_data: userData,
+          ...(activeContextId
+            ? { context_id: activeContextId }
+            : { user_data: userData }),
           session_id: sessionId,
           is_guest: actualIsGuest,
         };
 
         console.log("📤 Sending request to backend:", requestData);
 
+        // The backend only saves the turn to a session owned by this token's user
+        const {
+          data: { session: authSession },
+        } = await supabase.auth.getSession();
+
         const response = await fetch("http://localhost:5000/api/query", {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
+            ...(authSession
+              ? { Authorization: `Bearer ${authSession.access_token}` }
+              : {}),
           },
           body: JSON.stringify(requestData),
         });
@@ -606,6 +633,15 @@ function ChatBot() {
         const data = await response.json();
         console.log("✅ Backend response received");
 
+        if (data.context_expired) {
+          // Expired or revoked; get a fresh context for the next query
+          setContextId(null);
+          const storedEmail =
+            localStorage.getItem("userEmail") ||
+            localStorage.getItem("adminEmail");
+          if (storedEmail) fetchUserData(storedEmail, actualUserRole);
+        }
+
         if (data.response) {
           const botMessage = {
             text: data.response,
@@ -617,28 +653,11 @@ function ChatBot() {
           setIsTyping(false);
           setMessages((prev) => [...prev, botMessage]);
           console.log("💬 Bot message added to chat");
-
-          if (
-            !isGuestUser &&
-            !sessionId.startsWith("guest-") &&
-            !sessionId.startsWith("local-")
-          ) {
-            console.log("💾 Saving bot message to session:", sessionId);
-            try {
-              const { error } = await saveChatMessage(
-                sessionId,
-                data.response,
-                "bot"
-              );
-              if (error) {
-                console.error("❌ Error saving bot message:", error);
-              } else {
-                console.log("✅ Bot message saved to database");
-              }
-            } catch (error) {
-              console.error("💥 Error saving bot message:", error);
-            }
-          }
+          pendingMessagesRef.current[sessionId] = [
+            ...(pendingMessagesRef.current[sessionId] || []),
+            userMessage,
+            botMessage,
+          ].slice(-20);
 
           if (
             data.suggested_title &&
@@ -703,6 +722,11 @@ function ChatBot() {
 
   const handleLogout = async () => {
     console.log("🚪 LOGOUT INITIATED");
+    if (contextId) {
+      fetch(`http://localhost:5000/api/user-data/${contextId}`, {
+        method: "DELETE",
+      }).catch(() => {});
+    }
     localStorage.removeItem("currentSessionId");
     localStorage.clear();
     sessionStorage.clear();